@@ -1,15 +1,30 @@
 from .apitool import *
+from .bulk import *
+from .cassette import *
 from .config import *
+from .export import *
+from .snapshot import *
 from .table import *
+from .webhook import *
 
-def run():
+def run(diagnostics=None):
     import sys
     from qtpy.QtWidgets import QApplication
     
+    from .diagnostics import Diagnostics
     from .gui import MainWindow
 
     app = QApplication(sys.argv)
-    win = MainWindow(app)
+    if diagnostics is None:
+        diagnostics = Diagnostics.from_environment(sys.argv)
+    elif diagnostics is True:
+        diagnostics = Diagnostics()
+    elif isinstance(diagnostics, str):
+        diagnostics = Diagnostics(diagnostics)
+    win = MainWindow(app, diagnostics=diagnostics)
+    if diagnostics:
+        diagnostics.start()
+        app.aboutToQuit.connect(diagnostics.write)
     win.show()
     
     sys.exit(app.exec_())
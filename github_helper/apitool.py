@@ -3,10 +3,16 @@ API.
 """
 
 import collections
+import copy
+import http.client
 import json
+import random
+import socket
+import threading
+import time
 from urllib import request, error
 
-__all__ = ['GithubAPI']
+__all__ = ['GithubAPI', 'RetryPolicy']
 
 def _process_response(resp):
     """Process an HTTP response into JSON."""
@@ -16,40 +22,244 @@ def _process_response(resp):
 
 
 class ResponseCache():
+    """Thread safe, size limited store of (headers, data, time) responses,
+    evicting the least recently written entry first."""
 
     def __init__(self, maxsize=100):
         self.maxsize = maxsize
         self._data = collections.OrderedDict()
-    
+        self._lock = threading.RLock()
+
     def __getitem__(self, key):
-        return self._data[key]
+        with self._lock:
+            return self._data[key]
 
     def __setitem__(self, key, val):
-        if key in self._data:
-            del self._data[key]
-        self._data[key] = val
-        while len(self._data) > self.maxsize:
-            self._data.popitem()
+        with self._lock:
+            if key in self._data:
+                del self._data[key]
+            self._data[key] = val
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
 
     def __contains__(self, key):
-        return key in self._data
-            
+        with self._lock:
+            return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._data.get(key, default)
+
+    def expire(self):
+        """Mark every entry as out of date, keeping it for revalidation."""
+        with self._lock:
+            for key, (headers, data, _) in self._data.items():
+                self._data[key] = headers, data, float('-inf')
+
+
+class RetryPolicy():
+    """Decide whether, and after how long, to retry a failed request.
+
+    Only idempotent requests are retried, and only after transient
+    failures: gateway errors, dropped connections and timeouts. Delays
+    grow exponentially up to max_backoff, with full jitter so that
+    clients failing together do not retry together. Each retry spends
+    a token from a budget shared by all requests, which is slowly
+    refilled by successes, so a persistent outage stops being retried.
+    """
+
+    retry_codes = frozenset((500, 502, 503, 504))
+    idempotent_methods = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+    # PATCHes which only set these fields give the same result if repeated.
+    idempotent_patch_fields = frozenset(('archived',))
+
+    def __init__(self, max_retries=4, backoff=0.5, max_backoff=30.0,
+                 budget=20, refill=0.1, sleep=time.sleep):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.refill = refill
+        self.sleep = sleep
+        self.stats = collections.Counter()
+        self._tokens = budget
+        self._lock = threading.Lock()
+
+    def is_idempotent(self, http_method=None, data=None):
+        """Return whether a request may safely be sent more than once."""
+        method = (http_method or ('POST' if data else 'GET')).upper()
+        if method in self.idempotent_methods:
+            return True
+        if method == 'PATCH' and data:
+            return set(data) <= self.idempotent_patch_fields
+        return False
+
+    transient_errors = (ConnectionError, TimeoutError, socket.timeout,
+                        http.client.IncompleteRead)
+
+    def is_transient(self, err):
+        """Return whether a failure is worth retrying. Connection
+        failures are, but not e.g. DNS or certificate errors."""
+        if isinstance(err, error.HTTPError):
+            return err.code in self.retry_codes
+        if isinstance(err, error.URLError):
+            return isinstance(err.reason, self.transient_errors)
+        return isinstance(err, self.transient_errors)
+
+    def delay(self, attempt, err=None):
+        """Return the time in seconds to wait before a retry."""
+        delay = random.uniform(0, min(self.max_backoff,
+                                      self.backoff * 2**attempt))
+        headers = getattr(err, 'headers', None)
+        retry_after = headers.get('Retry-After') if headers else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(self.max_backoff, int(retry_after)))
+        return delay
+
+    def should_retry(self, err, attempt, idempotent):
+        """Record a failure, returning True if it should be retried."""
+        if isinstance(err, error.HTTPError) and err.code < 400:
+            # Not a failure, e.g. 304 Not Modified.
+            return False
+        with self._lock:
+            self.stats['failures'] += 1
+            if not (idempotent and self.is_transient(err)):
+                return False
+            if attempt >= self.max_retries:
+                self.stats['exhausted'] += 1
+                return False
+            if self._tokens < 1:
+                self.stats['over_budget'] += 1
+                return False
+            self._tokens -= 1
+            self.stats['retries'] += 1
+        return True
+
+    def record_success(self, attempt):
+        with self._lock:
+            self.stats['successes'] += 1
+            if attempt:
+                self.stats['recovered'] += 1
+            self._tokens = min(self.budget, self._tokens + self.refill)
+
+
+class _Flight():
+    """A single in-progress request, shared by all concurrent callers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+    def wait(self):
+        self.done.wait()
+        if self.exception:
+            raise self.exception
+        return self.result
+
 
 class GithubAPI():
-    """Class to wrap calls to the GitHub api."""
+    """Class to wrap calls to the GitHub api.
+
+    Concurrent identical GET requests are coalesced, so that only one
+    network request is made and every caller receives its result.
+    """
 
     base_url = "https://api.github.com"
 
-    def __init__(self, token=None, error_handler=None, cachesize=100):
+    def __init__(self, token=None, error_handler=None, cachesize=100,
+                 retry_policy=None, transport=None):
         self.set_token(token)
         self.error_handler = error_handler
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Callable opening a urllib Request, defaulting to urlopen.
+        self.transport = transport
         self._cache = ResponseCache(cachesize)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
 
     def set_token(self, token):
         """Set the personal access token for subsequent calls."""
         self.token = token
 
-    def __call__(self, endpoint, http_method=None, **data):
+    def without_error_handler(self, cachesize=None):
+        """Return a copy, with the current token and sharing the cache
+        and retry policy, which raises errors rather than passing them
+        to the error handler, e.g. for use from worker threads.
+
+        If cachesize is given the copy has its own cache of that size
+        instead, e.g. 0 so that a long export neither keeps every page
+        nor evicts the shared cache."""
+        api = copy.copy(self)
+        api.error_handler = None
+        if cachesize is not None:
+            api._cache = ResponseCache(cachesize)
+        return api
+
+    def __call__(self, endpoint, http_method=None, max_age=None, **data):
+        """Call the API, returning the decoded JSON response.
+
+        A GET with max_age set is answered from the cache, without
+        revalidation, if it was fetched within max_age seconds. Any
+        other request may change what earlier ones returned, so it
+        expires the whole cache.
+        """
+
+        try:
+            if data or http_method not in (None, 'GET'):
+                try:
+                    return self._fetch(endpoint, http_method, data)
+                finally:
+                    self.expire_cache()
+            if max_age is not None:
+                cached = self._cache.get(endpoint)
+                if cached and time.monotonic() - cached[2] < max_age:
+                    return cached[1]
+            return self._coalesced_get(endpoint)
+        except error.HTTPError as err:
+            if self.error_handler:
+                self.error_handler(err)
+                return err
+            raise err
+
+    def expire_cache(self):
+        """Make later requests revalidate every cached response, e.g.
+        after learning that repositories have changed."""
+        self._cache.expire()
+
+    def graphql(self, query, **variables):
+        """Run a GraphQL query or mutation, returning the whole response,
+        including any 'errors' alongside the 'data'."""
+        return self('/graphql', http_method='POST',
+                    query=query, variables=variables)
+
+    def _coalesced_get(self, endpoint):
+        """Make a GET request, sharing any identical one in flight."""
+
+        with self._inflight_lock:
+            flight = self._inflight.get(endpoint)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[endpoint] = _Flight()
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            flight.result = self._fetch(endpoint)
+        except Exception as err:
+            flight.exception = err
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[endpoint]
+            flight.done.set()
+        return flight.result
+
+    def _fetch(self, endpoint, http_method=None, data=None):
+        """Make a single request, revalidating against the cache."""
+
+        idempotent = self.retry_policy.is_idempotent(http_method, data)
 
         if data:
             data = str(json.dumps(data)).encode('utf-8')
@@ -59,27 +269,42 @@ class GithubAPI():
         req = request.Request(self.base_url+endpoint,
                               method=http_method,
                               data=data)
-        
+
         req.add_header('content-type', 'application/json')
         if self.token:
             req.add_header('Authorization', f'token {self.token}')
 
-        etag = None
-        if endpoint in self._cache:
-            etag = self._cache[endpoint][0].get('ETag', None)
-            
-        if etag:
-            req.add_header('If-None-Match', etag)
-            
+        cached = self._cache.get(endpoint)
+        if cached and req.get_method() == 'GET':
+            etag = cached[0].get('ETag', None)
+            if etag:
+                req.add_header('If-None-Match', etag)
+
         try:
-            resp = request.urlopen(req)
-            self._cache[endpoint] = resp.headers, _process_response(resp)
+            headers, data = self._send(req, idempotent)
         except error.HTTPError as err:
-            if err.code == 304:
-                pass
-            elif self.error_handler:
-                self.error_handler(err)
-                return err
-            else:
-                raise err
-        return self._cache[endpoint][1]
+            if err.code == 304 and cached:
+                self._cache[endpoint] = cached[0], cached[1], time.monotonic()
+                return cached[1]
+            raise err
+        self._cache[endpoint] = headers, data, time.monotonic()
+        return data
+
+    def _send(self, req, idempotent):
+        """Make a request and read its response, retrying transient
+        failures of either per the policy. Returns (headers, data)."""
+
+        transport = self.transport or request.urlopen
+        attempt = 0
+        while True:
+            try:
+                resp = transport(req)
+                data = _process_response(resp)
+            except Exception as err:
+                if not self.retry_policy.should_retry(err, attempt, idempotent):
+                    raise
+                self.retry_policy.sleep(self.retry_policy.delay(attempt, err))
+                attempt += 1
+                continue
+            self.retry_policy.record_success(attempt)
+            return resp.headers, data
@@ -0,0 +1,116 @@
+"""Module applying write operations to many repositories at once,
+batching them into GraphQL mutations where possible.
+"""
+
+__all__ = ['archive_repositories']
+
+_ARCHIVE = ('{alias}: archiveRepository(input: {{repositoryId: ${alias}}})'
+            ' {{ repository {{ isArchived }} }}')
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start+size]
+
+
+def _archive_batch(api, batch):
+    """Archive a batch with one aliased GraphQL mutation, returning a
+    dict of repository name to error message, or None on success."""
+
+    aliases = {f'r{count}': repo for count, repo in enumerate(batch)}
+    query = 'mutation({}) {{\n{}\n}}'.format(
+        ', '.join(f'${alias}: ID!' for alias in aliases),
+        '\n'.join(_ARCHIVE.format(alias=alias) for alias in aliases))
+
+    response = api.graphql(query, **{alias: repo['node_id']
+                                     for alias, repo in aliases.items()})
+    if not isinstance(response, dict) or response.get('data') is None:
+        errors = response.get('errors', []) if isinstance(response, dict) else []
+        raise RuntimeError('; '.join(err.get('message', '') for err in errors)
+                           or 'GraphQL request failed')
+
+    failures = {}
+    for err in response.get('errors', []):
+        path = err.get('path') or []
+        if path and path[0] in aliases:
+            failures[aliases[path[0]]['name']] = err.get('message', 'failed')
+
+    results = {}
+    for alias, repo in aliases.items():
+        data = response['data'].get(alias)
+        if repo['name'] in failures:
+            results[repo['name']] = failures[repo['name']]
+        elif data and data['repository']['isArchived']:
+            results[repo['name']] = None
+        else:
+            results[repo['name']] = 'not archived'
+    return results
+
+
+def _archive_rest(api, owner, name):
+    try:
+        response = api(f'/repos/{owner}/{name}', http_method='PATCH',
+                       archived=True)
+    except OSError as err:
+        # Including URLError and HTTPError, as well as dropped sockets.
+        return str(err)
+    if isinstance(response, Exception):
+        return str(response)
+    return None
+
+
+def archive_repositories(api, owner, repos, batch_size=50, progress=None):
+    """Archive repositories, many per GraphQL request.
+
+    Parameters
+    ----------
+    api : GithubAPI
+        The api to call. An error_handler on it is best left unset, so
+        failures are collected rather than reported one by one.
+    owner : str
+        The owning user or organization.
+    repos : iterable of dict
+        Repositories with 'name' and, for the GraphQL path, 'node_id'.
+    batch_size : int
+        The number of mutations per GraphQL request.
+    progress : callable, optional
+        Called with the running count of repositories handled.
+
+    Returns
+    -------
+    dict
+        Repository name to None on success, or an error message.
+
+    Repositories without a node_id, in a batch whose request failed, or
+    which failed individually within a batch, are retried one at a time
+    over the REST API.
+    """
+
+    batched, rest = [], []
+    for repo in repos:
+        repo = dict(repo)
+        if isinstance(repo.get('node_id'), str):
+            batched.append(repo)
+        else:
+            rest.append(repo)
+
+    results = {}
+    for batch in _batches(batched, max(1, int(batch_size))):
+        try:
+            batch_results = _archive_batch(api, batch)
+        except (OSError, RuntimeError):
+            batch_results = {repo['name']: 'failed' for repo in batch}
+        for repo in batch:
+            if batch_results[repo['name']] is None:
+                results[repo['name']] = None
+            else:
+                rest.append(repo)
+        if progress:
+            progress(len(results))
+
+    for repo in rest:
+        results[repo['name']] = _archive_rest(api, owner, repo['name'])
+        if progress:
+            progress(len(results))
+
+    return results
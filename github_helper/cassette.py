@@ -0,0 +1,161 @@
+"""Module recording HTTP exchanges with the GitHub API to cassette
+files, and replaying them offline, for repeatable tests and profiling.
+
+Both classes are transports for GithubAPI:
+
+    with RecordingTransport('org.json') as recorder:
+        api = GithubAPI(token, transport=recorder)
+        ...
+
+    api = GithubAPI(transport=ReplayTransport('org.json', latency_scale=0))
+"""
+
+import collections
+import http.client
+import io
+import json
+import threading
+import time
+from urllib import request, error
+
+__all__ = ['RecordingTransport', 'ReplayTransport', 'CassetteError']
+
+CASSETTE_VERSION = 1
+
+
+class CassetteError(Exception):
+    """Raised when a replayed request was never recorded."""
+
+
+def _headers(items):
+    message = http.client.HTTPMessage()
+    for key, val in items:
+        message[key] = val
+    return message
+
+
+class CassetteResponse(io.BytesIO):
+    """Replayed stand in for an http.client.HTTPResponse."""
+
+    def __init__(self, status, headers, body):
+        super().__init__(body)
+        self.status = status
+        self.length = len(body)
+        self.headers = _headers(headers)
+
+    def getcode(self):
+        return self.status
+
+
+class RecordingTransport():
+    """Pass requests through to another transport, recording each
+    request, response and its duration."""
+
+    def __init__(self, path, transport=None):
+        self.path = path
+        self.transport = transport
+        self.interactions = []
+        self._lock = threading.Lock()
+
+    def __call__(self, req):
+        record = {'request': {'method': req.get_method(),
+                              'url': req.full_url,
+                              'headers': {key: val for key, val
+                                          in req.header_items()
+                                          if key.lower() != 'authorization'},
+                              'body': req.data.decode('utf-8')
+                                      if req.data else None}}
+
+        transport = self.transport or request.urlopen
+        start = time.perf_counter()
+        try:
+            resp = transport(req)
+            status, headers, body = resp.status, resp.headers, resp.read()
+            failure = None
+        except error.HTTPError as err:
+            status, headers, body = err.code, err.headers, err.read() or b''
+            failure = err
+        except error.URLError as err:
+            record['error'] = str(err.reason)
+            record['elapsed'] = time.perf_counter() - start
+            self._append(record)
+            raise
+
+        record['elapsed'] = time.perf_counter() - start
+        record['response'] = {'status': status,
+                              'headers': list(headers.items()) if headers else [],
+                              'body': body.decode('utf-8')}
+        self._append(record)
+
+        if failure:
+            raise error.HTTPError(req.full_url, status, failure.msg,
+                                  _headers(record['response']['headers']),
+                                  io.BytesIO(body))
+        return CassetteResponse(status, record['response']['headers'], body)
+
+    def _append(self, record):
+        with self._lock:
+            self.interactions.append(record)
+
+    def save(self):
+        with self._lock, open(self.path, 'w') as outfile:
+            json.dump({'version': CASSETTE_VERSION,
+                       'interactions': self.interactions}, outfile, indent=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.save()
+
+
+class ReplayTransport():
+    """Answer requests from a cassette, in recorded order, optionally
+    reproducing the recorded latency scaled by latency_scale."""
+
+    def __init__(self, path, latency_scale=1.0, sleep=time.sleep):
+        with open(path, 'r') as infile:
+            cassette = json.load(infile)
+        if cassette.get('version') != CASSETTE_VERSION:
+            raise CassetteError(f'Unsupported cassette version in "{path}"')
+
+        self.latency_scale = latency_scale
+        self.sleep = sleep
+        self.replayed = 0
+        self.latency = 0.0
+        self._lock = threading.Lock()
+        self._queues = collections.defaultdict(collections.deque)
+        for record in cassette['interactions']:
+            req = record['request']
+            self._queues[req['method'], req['url'],
+                         req['body']].append(record)
+
+    def _next(self, key):
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise CassetteError('No recorded response for %s %s' % key[:2])
+            # The final recording answers any further repeats.
+            record = queue.popleft() if len(queue) > 1 else queue[0]
+            self.replayed += 1
+            self.latency += record['elapsed']*self.latency_scale
+        return record
+
+    def __call__(self, req):
+        body = req.data.decode('utf-8') if req.data else None
+        record = self._next((req.get_method(), req.full_url, body))
+
+        if self.latency_scale:
+            self.sleep(record['elapsed']*self.latency_scale)
+
+        if 'error' in record:
+            raise error.URLError(record['error'])
+
+        response = record['response']
+        body = response['body'].encode('utf-8')
+        if response['status'] >= 300:
+            raise error.HTTPError(req.full_url, response['status'],
+                                  http.client.responses.get(response['status'], ''),
+                                  _headers(response['headers']),
+                                  io.BytesIO(body))
+        return CassetteResponse(response['status'], response['headers'], body)
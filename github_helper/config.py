@@ -9,16 +9,21 @@ class Configurator():
 
     def __init__(self, path='config.json', defaults=None):
         self.path = path
+        # Saved values override the defaults, but settings added since
+        # the file was written still appear.
+        self._data = dict(defaults or {})
         try:
             with open(self.path, 'r') as configfile:
-                self._data = json.load(configfile)
+                self._data.update(json.load(configfile))
         except FileNotFoundError:
             print(f'Configuration file "{path}" not found. Using defaults.')
-            self._data = defaults or {}
 
     def __getitem__(self, key):
         return self._data[key]
 
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
     def __setitem__(self, key, val):
         self._data[key] = val
 
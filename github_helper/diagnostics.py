@@ -0,0 +1,174 @@
+"""Module measuring stalls of the Qt event loop and timing the handlers
+run on the main thread, to find the causes of an unresponsive window.
+
+Enabled from run() by the --diagnostics[=path] and --profile flags, or
+the GITHUB_HELPER_DIAGNOSTICS and GITHUB_HELPER_PROFILE environment
+variables.
+"""
+
+import collections
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+from qtpy import QtCore
+
+__all__ = ['Diagnostics']
+
+DEFAULT_REPORT = 'github_helper_diagnostics.json'
+
+
+def _positional_count(func):
+    """Return how many positional arguments func accepts, or None if
+    it takes *args."""
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    count = 0
+    for param in params:
+        if param.kind == param.VAR_POSITIONAL:
+            return None
+        if param.kind in (param.POSITIONAL_ONLY,
+                          param.POSITIONAL_OR_KEYWORD):
+            count += 1
+    return count
+
+
+class Diagnostics(QtCore.QObject):
+    """Watchdog for the Qt event loop.
+
+    A timer is scheduled on the main thread every interval milliseconds.
+    When it fires late by more than threshold milliseconds the loop was
+    stalled, and the stall is recorded with the handlers that ran since
+    the previous tick. Handlers wrapped by this class are timed and,
+    optionally, profiled with cProfile.
+    """
+
+    def __init__(self, path=DEFAULT_REPORT, interval=50, threshold=100,
+                 profile=False, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls = []
+        self.handlers = collections.defaultdict(
+            lambda: {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        self._recent = []
+        self._depth = 0
+        self._profiler = cProfile.Profile() if profile else None
+        self._last = None
+        # Handlers also called from worker threads, such as the api
+        # error handler, are only measured on the thread running Qt.
+        self._thread_id = threading.get_ident()
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self._tick)
+
+    @classmethod
+    def from_environment(cls, argv=(), environ=os.environ):
+        """Build from command line flags or environment variables,
+        returning None if diagnostics have not been requested."""
+
+        path = environ.get('GITHUB_HELPER_DIAGNOSTICS', '')
+        if path in ('', '0'):
+            path = None
+        profile = environ.get('GITHUB_HELPER_PROFILE', '') not in ('', '0')
+        for arg in argv:
+            if arg == '--diagnostics':
+                path = path or DEFAULT_REPORT
+            elif arg.startswith('--diagnostics='):
+                path = arg.split('=', 1)[1]
+            elif arg == '--profile':
+                profile = True
+        if path in ('1', 'true'):
+            path = DEFAULT_REPORT
+        if not (path or profile):
+            return None
+        return cls(path or DEFAULT_REPORT, profile=profile)
+
+    def start(self):
+        self._last = time.perf_counter()
+        self._timer.start(self.interval)
+
+    def stop(self):
+        self._timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        stall = 1000*(now - self._last) - self.interval
+        if stall >= self.threshold:
+            self.stalls.append({'time': time.time(),
+                                'duration_ms': round(stall, 1),
+                                'handlers': self._recent})
+        self._recent = []
+        self._last = now
+
+    def wrap(self, func, name=None):
+        """Return func wrapped to be timed and profiled when called."""
+
+        name = name or getattr(func, '__qualname__', repr(func))
+        nargs = _positional_count(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Qt passes every signal argument; drop any func can't take.
+            if nargs is not None:
+                args = args[:nargs]
+            if threading.get_ident() != self._thread_id:
+                return func(*args, **kwargs)
+            self._recent.append(name)
+            if self._profiler and not self._depth:
+                self._profiler.enable()
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = 1000*(time.perf_counter() - start)
+                self._depth -= 1
+                if self._profiler and not self._depth:
+                    self._profiler.disable()
+                stats = self.handlers[name]
+                stats['calls'] += 1
+                stats['total_ms'] += elapsed
+                stats['max_ms'] = max(stats['max_ms'], elapsed)
+
+        return wrapper
+
+    def instrument(self, obj):
+        """Wrap the private methods of obj, so that every handler it
+        later connects to a signal is measured."""
+
+        for name, attr in vars(type(obj)).items():
+            if (name.startswith('_') and not name.startswith('__')
+                    and inspect.isfunction(attr)):
+                setattr(obj, name, self.wrap(getattr(obj, name)))
+
+    def report(self, top=25):
+        """Return the collected measurements as a dict."""
+
+        report = {'interval_ms': self.interval,
+                  'threshold_ms': self.threshold,
+                  'stalls': self.stalls,
+                  'handlers': dict(sorted(self.handlers.items(),
+                                          key=lambda item: -item[1]['total_ms']))}
+        if self._profiler:
+            out = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=out)
+            stats.sort_stats('cumulative').print_stats(top)
+            report['profile'] = out.getvalue().splitlines()
+        return report
+
+    def write(self):
+        """Write the report, and any raw profile data, to disk."""
+
+        with open(self.path, 'w') as outfile:
+            json.dump(self.report(), outfile, indent=2)
+        if self._profiler:
+            self._profiler.dump_stats(os.path.splitext(self.path)[0]+'.prof')
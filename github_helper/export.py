@@ -0,0 +1,193 @@
+"""Module streaming a repository inventory to disk as CSV, JSON Lines
+or Parquet, one page at a time, so that memory use is bounded by the
+page size rather than the size of the organization.
+"""
+
+import csv
+import json
+import pathlib
+from urllib import error
+
+__all__ = ['iter_pages', 'export_inventory', 'EXPORT_FORMATS', 'ENRICHMENTS']
+
+DEFAULT_COLUMNS = ('id', 'name', 'full_name', 'html_url', 'private',
+                   'fork', 'archived', 'language', 'default_branch',
+                   'size', 'stargazers_count', 'created_at', 'updated_at',
+                   'pushed_at', 'topics')
+
+_PARQUET_TYPES = {'id': 'int64',
+                  'size': 'int64',
+                  'stargazers_count': 'int64',
+                  'private': 'bool_',
+                  'fork': 'bool_',
+                  'archived': 'bool_',
+                  'protected': 'bool_'}
+
+
+def iter_pages(api, endpoint, per_page=50, interrupt=None):
+    """Yield successive pages of a paginated list endpoint."""
+    page = 0
+    while not (interrupt and interrupt()):
+        page += 1
+        data = api(f'{endpoint}?page={page}&per_page={per_page}')
+        if not isinstance(data, list) or not data:
+            return
+        yield data
+        if len(data) < per_page:
+            return
+
+
+def team_permissions(api, repo):
+    """Return the teams with access to a repository, as team:permission."""
+    try:
+        teams = api(f"/repos/{repo['full_name']}/teams?per_page=100")
+    except error.HTTPError:
+        return None
+    if not isinstance(teams, list):
+        return None
+    return ';'.join(f"{team['slug']}:{team['permission']}" for team in teams)
+
+
+def branch_protection(api, repo):
+    """Return whether the default branch of a repository is protected."""
+    try:
+        branch = api(f"/repos/{repo['full_name']}"
+                     f"/branches/{repo['default_branch']}")
+    except error.HTTPError:
+        return None
+    if not isinstance(branch, dict):
+        return None
+    return branch.get('protected')
+
+
+ENRICHMENTS = {'teams': team_permissions,
+               'protected': branch_protection}
+
+
+def _encode(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+class _CSVWriter():
+
+    def __init__(self, path, columns):
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.DictWriter(self._file, columns,
+                                      extrasaction='ignore')
+        self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows({key: _encode(val) for key, val in row.items()}
+                               for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _JSONLWriter():
+
+    def __init__(self, path, columns):
+        self._file = open(path, 'w')
+        self.columns = columns
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter():
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Parquet export requires the pyarrow package.')
+        self._pa = pyarrow
+        self.columns = columns
+        self.schema = pyarrow.schema(
+            [(col, getattr(pyarrow, _PARQUET_TYPES.get(col, 'string'))())
+             for col in columns])
+        self._writer = pyarrow.parquet.ParquetWriter(str(path), self.schema)
+
+    def write(self, rows):
+        data = {col: [self._convert(col, row.get(col)) for row in rows]
+                for col in self.columns}
+        table = self._pa.Table.from_pydict(data, schema=self.schema)
+        self._writer.write_table(table)
+
+    def _convert(self, col, value):
+        if value is None or col in _PARQUET_TYPES:
+            return value
+        value = _encode(value)
+        return value if isinstance(value, str) else str(value)
+
+    def close(self):
+        self._writer.close()
+
+
+EXPORT_FORMATS = {'csv': _CSVWriter,
+                  'jsonl': _JSONLWriter,
+                  'parquet': _ParquetWriter}
+
+
+def export_inventory(api, endpoint, path, fmt=None,
+                     columns=DEFAULT_COLUMNS, enrich=(),
+                     per_page=50, progress=None, interrupt=None):
+    """Stream the repositories listed at endpoint into a file.
+
+    Parameters
+    ----------
+    api : GithubAPI
+        The api used to fetch the inventory and any enrichment.
+    endpoint : str
+        A paginated repository list, e.g. "/orgs/fluidityproject/repos".
+    path : str or pathlib.Path
+        The output file.
+    fmt : str, optional
+        One of "csv", "jsonl" or "parquet". Taken from the file suffix
+        if not given.
+    columns : sequence of str
+        The repository fields to write.
+    enrich : sequence of str
+        Names from ENRICHMENTS of extra per repository columns to fetch.
+    per_page : int
+        The page size, which bounds the number of rows held in memory.
+    progress : callable, optional
+        Called with the running count of rows written.
+    interrupt : callable, optional
+        Polled between pages; the export stops early if it returns True.
+
+    Returns
+    -------
+    int
+        The number of repositories written.
+    """
+
+    fmt = (fmt or pathlib.Path(path).suffix.lstrip('.')).lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format "{fmt}"')
+
+    columns = list(columns) + list(enrich)
+    writer = EXPORT_FORMATS[fmt](path, columns)
+    count = 0
+    try:
+        for page in iter_pages(api, endpoint, per_page, interrupt):
+            rows = []
+            for repo in page:
+                row = {col: repo.get(col) for col in columns}
+                for name in enrich:
+                    row[name] = ENRICHMENTS[name](api, repo)
+                rows.append(row)
+            writer.write(rows)
+            count += len(rows)
+            if progress:
+                progress(count)
+    finally:
+        writer.close()
+    return count
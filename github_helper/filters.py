@@ -0,0 +1,430 @@
+"""Module compiling repository filter expressions into vectorized
+operations over a pandas DataFrame of repositories.
+
+Expressions combine terms with AND, OR, NOT and parentheses; adjacent
+terms are ANDed. A term is one of
+
+    fluidity-*                 a glob on the repository name
+    fork                       a true boolean field
+    language:python            a glob on a field, or on any list item
+    visibility=private         equality (also !=)
+    size>10000                 comparison (also <, <=, >=)
+    pushed_at<2024-01-01       comparison with a date
+    pushed_at<90d              ... or with an age, here 90 days ago
+
+so that, for example,
+
+    name:fluidity-* AND pushed_at<2024-01-01 AND NOT fork
+
+Values containing spaces or operators may be double quoted. Text is
+matched case-insensitively, as GitHub treats names, languages and
+topics.
+"""
+
+import re
+import weakref
+
+import numpy as np
+import pandas as pd
+
+__all__ = ['FilterError', 'RepositoryIndex', 'compile_filter',
+           'is_expression', 'glob_regex', 'REPOSITORY_FIELDS']
+
+KEYWORDS = ('AND', 'OR', 'NOT')
+
+_TOKEN = re.compile(r'\s*(?:(?P<paren>[()])'
+                    r'|"(?P<quoted>(?:[^"\\]|\\.)*)"'
+                    r'|(?P<op><=|>=|!=|[:=<>])'
+                    r'|(?P<word>[^\s()<>=!:"]+))')
+
+_AGE = re.compile(r'^(\d+)([dwmy])$')
+_AGE_DAYS = {'d': 1, 'w': 7, 'm': 30, 'y': 365}
+
+# Kinds of the filterable fields of a GitHub repository, used to check
+# expressions before any repositories have been listed.
+REPOSITORY_FIELDS = {'name': 'string',
+                     'full_name': 'string',
+                     'description': 'string',
+                     'homepage': 'string',
+                     'html_url': 'string',
+                     'node_id': 'string',
+                     'language': 'string',
+                     'visibility': 'string',
+                     'default_branch': 'string',
+                     'topics': 'list',
+                     'private': 'bool',
+                     'fork': 'bool',
+                     'archived': 'bool',
+                     'disabled': 'bool',
+                     'is_template': 'bool',
+                     'has_issues': 'bool',
+                     'has_projects': 'bool',
+                     'has_wiki': 'bool',
+                     'has_pages': 'bool',
+                     'has_downloads': 'bool',
+                     'id': 'number',
+                     'size': 'number',
+                     'stargazers_count': 'number',
+                     'watchers_count': 'number',
+                     'forks_count': 'number',
+                     'open_issues_count': 'number',
+                     'created_at': 'date',
+                     'updated_at': 'date',
+                     'pushed_at': 'date'}
+
+
+class FilterError(ValueError):
+    """Raised for a malformed filter expression."""
+
+
+def glob_regex(pattern):
+    """Translate a shell style glob into an anchored regular expression."""
+    template = re.escape(pattern)
+    template = template.replace(r'\*', '.*')
+    template = template.replace(r'\?', '.')
+    template = template.replace(r'\[', '[')
+    template = template.replace(r'\]', ']')
+    template = template.replace(r'\-', '-')
+    return f'^{template}$'
+
+
+def _is_glob(value):
+    return any(char in value for char in '*?[')
+
+
+def _glob_prefix(value):
+    """Return the literal prefix of a glob like "abc*", else None."""
+    if value.endswith('*') and not _is_glob(value[:-1]):
+        return value[:-1]
+    return None
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise FilterError(f'Unexpected "{text[pos:]}"')
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'quoted':
+            kind, value = 'value', re.sub(r'\\(.)', r'\1', value)
+        elif kind == 'word' and value in KEYWORDS:
+            kind = 'keyword'
+        tokens.append((kind, value))
+    return tokens
+
+
+def is_expression(text):
+    """Return whether text uses filter syntax, rather than being a plain
+    name glob."""
+    try:
+        tokens = _tokenize(text)
+    except FilterError:
+        return False
+    return len(tokens) > 1 or any(kind != 'word' for kind, _ in tokens)
+
+
+class RepositoryIndex():
+    """Repository columns converted once, and cached, for filtering.
+
+    String columns, and the items of list columns such as topics, are
+    factorized into sorted unique values and per row codes, so matching
+    tests each distinct value once. Date columns are parsed to UTC
+    timestamps.
+    """
+
+    date_fields = frozenset(('pushed_at', 'created_at', 'updated_at'))
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.size = len(frame.index)
+        self._columns = {}
+        self._categories = {}
+        self._kinds = {}
+
+    def kind(self, field):
+        """Return one of 'bool', 'number', 'date', 'list' or 'string'."""
+        if field not in self._kinds:
+            self._kinds[field] = self._kind(field)
+        return self._kinds[field]
+
+    def _kind(self, field):
+        if field not in self.frame.columns:
+            raise FilterError(f'Unknown field "{field}"')
+        if field in self.date_fields:
+            return 'date'
+        column = self.frame[field]
+        if column.dtype == bool:
+            return 'bool'
+        if pd.api.types.is_numeric_dtype(column.dtype):
+            return 'number'
+        sample = column.dropna()
+        if len(sample) and isinstance(sample.iloc[0], (list, tuple)):
+            return 'list'
+        if len(sample) and isinstance(sample.iloc[0], (bool, np.bool_)):
+            return 'bool'
+        return 'string'
+
+    def column(self, field):
+        """Return a field as a numpy array suited to its kind."""
+        if field not in self._columns:
+            kind = self.kind(field)
+            column = self.frame[field]
+            if kind == 'date':
+                values = pd.to_datetime(column, utc=True).values
+            elif kind == 'bool':
+                values = column.fillna(False).astype(bool).values
+            elif kind == 'number':
+                values = column.values.astype(float)
+            else:
+                values = column.values
+            self._columns[field] = values
+        return self._columns[field]
+
+    def categories(self, field):
+        """Return (uniques, codes, rows) for a string or list field.
+
+        uniques is a sorted pd.Index of the distinct lower-cased strings
+        and codes the position in it of each value, or -1 if missing. For list
+        fields, rows gives the row of each item, else it is None.
+        """
+        if field not in self._categories:
+            values = self.column(field)
+            rows = None
+            if self.kind(field) == 'list':
+                lists = [items if isinstance(items, (list, tuple)) else ()
+                         for items in values]
+                rows = np.repeat(np.arange(self.size),
+                                 [len(items) for items in lists])
+                values = [item for items in lists for item in items]
+            values = [value.lower() if isinstance(value, str) else None
+                      for value in values]
+            codes, uniques = pd.factorize(np.array(values, dtype=object),
+                                          sort=True)
+            uniques = pd.Index(uniques, dtype=object)
+            self._categories[field] = uniques, codes, rows
+        return self._categories[field]
+
+
+_last_index = (None, None)
+
+def index_for(frame):
+    """Return a RepositoryIndex for frame, reusing the previous one if
+    it was built for the same frame."""
+    global _last_index
+    ref, index = _last_index
+    if ref is None or ref() is not frame:
+        index = RepositoryIndex(frame)
+        _last_index = weakref.ref(frame), index
+    return index
+
+
+def _parse_value(kind, value):
+    if kind == 'date':
+        age = _AGE.match(value)
+        try:
+            if age:
+                days = int(age.group(1)) * _AGE_DAYS[age.group(2)]
+                return (pd.Timestamp.now(tz='UTC')
+                        - pd.Timedelta(days=days)).to_datetime64()
+            return pd.Timestamp(value, tz='UTC').to_datetime64()
+        except (ValueError, OverflowError):
+            raise FilterError(f'Invalid date "{value}"')
+    if kind == 'number':
+        try:
+            return float(value)
+        except ValueError:
+            raise FilterError(f'Invalid number "{value}"')
+    if kind == 'bool':
+        if value.lower() not in ('true', 'false'):
+            raise FilterError(f'Invalid boolean "{value}"')
+        return value.lower() == 'true'
+    return value
+
+
+def _match(index, field, value):
+    """Rows where a string field, or any list item, matches value."""
+    uniques, codes, rows = index.categories(field)
+    value = value.lower()
+    hits = np.zeros(len(uniques) + 1, dtype=bool)
+    prefix = _glob_prefix(value)
+    if not _is_glob(value):
+        code = uniques.get_indexer([value])[0]
+        if code >= 0:
+            hits[code] = True
+    elif prefix is not None:
+        # The uniques are sorted, so a prefix matches a contiguous run.
+        values = uniques.values
+        first = np.searchsorted(values, prefix, 'left')
+        last = np.searchsorted(values, prefix + '\U0010ffff', 'left')
+        hits[first:last] = True
+    else:
+        matched = uniques.str.match(glob_regex(value))
+        hits[:-1] = np.asarray(matched, dtype=bool)
+    # Missing values have code -1, so pick up the final False.
+    matched = hits[codes]
+    if rows is None:
+        return matched
+    mask = np.zeros(index.size, dtype=bool)
+    mask[rows[matched]] = True
+    return mask
+
+
+def _check(field, op, value, kind):
+    """Raise FilterError if a term is invalid for a field of this kind,
+    else return the parsed value."""
+    if op is None:
+        if kind != 'bool':
+            raise FilterError(f'Field "{field}" is not a boolean')
+        return None
+    target = _parse_value(kind, value)
+    if kind in ('string', 'list') and op not in (':', '=', '!='):
+        raise FilterError(f'Cannot compare text field "{field}"'
+                          f' with "{op}"')
+    return target
+
+
+def _term(field, op, value):
+
+    def evaluate(index):
+        kind = index.kind(field)
+        target = _check(field, op, value, kind)
+        if op is None:
+            return index.column(field)
+        if kind in ('string', 'list'):
+            if op in (':', '='):
+                return _match(index, field, target)
+            return ~_match(index, field, target)
+        column = index.column(field)
+        if kind == 'date':
+            valid = ~np.isnat(column)
+        else:
+            valid = ~np.isnan(column) if kind == 'number' else True
+        with np.errstate(invalid='ignore'):
+            if op in (':', '='):
+                return valid & (column == target)
+            if op == '!=':
+                return ~valid | (column != target)
+            if op == '<':
+                return valid & (column < target)
+            if op == '<=':
+                return valid & (column <= target)
+            if op == '>':
+                return valid & (column > target)
+            return valid & (column >= target)
+
+    return evaluate
+
+
+class _Parser():
+
+    def __init__(self, text, schema=None):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.fields = set()
+        self.schema = schema
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None, None
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            return lambda index: np.ones(index.size, dtype=bool)
+        node = self.or_expr()
+        if self.pos < len(self.tokens):
+            raise FilterError(f'Unexpected "{self.peek()[1]}"')
+        return node
+
+    def or_expr(self):
+        nodes = [self.and_expr()]
+        while self.peek() == ('keyword', 'OR'):
+            self.take()
+            nodes.append(self.and_expr())
+        if len(nodes) == 1:
+            return nodes[0]
+        return lambda index: np.logical_or.reduce([node(index)
+                                                   for node in nodes])
+
+    def and_expr(self):
+        nodes = [self.not_expr()]
+        while self.peek()[0] is not None and self.peek() not in (
+                ('keyword', 'OR'), ('paren', ')')):
+            if self.peek() == ('keyword', 'AND'):
+                self.take()
+            nodes.append(self.not_expr())
+        if len(nodes) == 1:
+            return nodes[0]
+        return lambda index: np.logical_and.reduce([node(index)
+                                                    for node in nodes])
+
+    def not_expr(self):
+        kind, value = self.take()
+        if (kind, value) == ('keyword', 'NOT'):
+            node = self.not_expr()
+            return lambda index: ~node(index)
+        if (kind, value) == ('paren', '('):
+            node = self.or_expr()
+            if self.take() != ('paren', ')'):
+                raise FilterError('Missing ")"')
+            return node
+        if kind not in ('word', 'value'):
+            raise FilterError(f'Unexpected "{value}"' if value
+                              else 'Unexpected end of expression')
+        if self.peek()[0] == 'op':
+            _, op = self.take()
+            value_kind, target = self.take()
+            if value_kind not in ('word', 'value'):
+                raise FilterError(f'Missing value after "{value}{op}"')
+            self.fields.add(value)
+            if self.schema is not None:
+                if value not in self.schema:
+                    raise FilterError(f'Unknown field "{value}"')
+                _check(value, op, target, self.schema[value])
+            return _term(value, op, target)
+        return self.bare(value)
+
+    def bare(self, value):
+        """A lone word is a boolean field if one exists, else a name glob."""
+        name_glob = _term('name', ':', value)
+        boolean = _term(value, None, None)
+        self.fields.add(value)
+
+        def evaluate(index):
+            if value in index.frame.columns and index.kind(value) == 'bool':
+                return boolean(index)
+            return name_glob(index)
+
+        return evaluate
+
+
+def compile_filter(text, schema=None):
+    """Compile an expression to a function of a RepositoryIndex or
+    DataFrame, returning a boolean numpy array of matching rows.
+
+    If a schema of field name to kind, such as REPOSITORY_FIELDS, is
+    given, field names and values are checked against it now, rather
+    than when the function is applied.
+
+    The set of field names used is available as the .fields attribute.
+    """
+    parser = _Parser(text, schema)
+    node = parser.parse()
+
+    def evaluate(repos):
+        if isinstance(repos, pd.DataFrame):
+            repos = index_for(repos)
+        return np.asarray(node(repos), dtype=bool)
+
+    evaluate.fields = parser.fields
+    return evaluate
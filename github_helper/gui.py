@@ -2,30 +2,47 @@
 interact with GitHub.
 """
 
+import functools
+import http.client
 import os
 import pathlib
-import re
 import sys
+import time
 import webbrowser
 
 import pandas as pd
 from qtpy import QtWidgets, QtCore, QtGui
 
-from . import GithubAPI, Configurator, PandasModel
+from . import (GithubAPI, Configurator, EnrichedModel, Inventory,
+               WebhookReceiver, archive_repositories, export_inventory,
+               update_frame)
+from .export import branch_protection, team_permissions
+from .filters import (REPOSITORY_FIELDS, FilterError, compile_filter,
+                      glob_regex, is_expression)
+from .snapshot import load_snapshot, save_snapshot, snapshot_path
+
+
+# Milliseconds after the identity stops changing before listing it.
+PREFETCH_DELAY = 750
+# Seconds for which listed pages are reused without revalidation.
+PREFETCH_MAX_AGE = 300
 
 
 def matching_repositories(repos, pattern, show_archived=False):
+    """Select repositories by a name glob or a filter expression (see
+    the filters module). Archived repositories are dropped unless
+    show_archived is set or the expression tests the archived field."""
     if type(repos) is not pd.DataFrame:
-        repos = pd.io.json.json_normalize(repos, max_level=0)
-        
-    template = re.escape(pattern)
-    template = template.replace(r'\*', '.*')
-    template = template.replace(r'\?', '.')
-    template = template.replace(r'\[', '[')
-    template = template.replace(r'\]', ']')
-    template = template.replace(r'\-', '-')
-
-    idx = repos.name.str.contains(f'^{template}$')
+        repos = pd.DataFrame(list(repos))
+
+    if is_expression(pattern):
+        select = compile_filter(pattern)
+        idx = select(repos)
+        if not (show_archived or 'archived' in select.fields):
+            idx &= ~repos.archived.values.astype(bool)
+        return repos.loc[idx]
+
+    idx = repos.name.str.contains(glob_regex(pattern), case=False)
     if not show_archived:
         idx &= ~repos.archived
         
@@ -36,26 +53,100 @@ class Pager(QtCore.QObject):
     finished = QtCore.Signal()
     progress = QtCore.Signal(int)
 
-    def __init__(self, api, endpoint, data, maxlen):
+    def __init__(self, api, endpoint, data, maxlen, max_age=None):
         super().__init__()
         self.api = api
         self.endpoint = endpoint
         self.data = data
         self.maxlen = maxlen
+        self.max_age = max_age
+        self.complete = False
 
     @QtCore.Slot()
     def run(self):
+        self._page()
+        self.finished.emit()
+
+    def _page(self):
 
         interrupt = QtCore.QThread.currentThread().isInterruptionRequested
 
         page = 0
-        self.api(self.endpoint)
+        self.api(self.endpoint, max_age=self.max_age)
         while self.maxlen - len(self.data) > 0 and not interrupt():
             page += 1
             page_endpoint = f'{self.endpoint}?page={page}&per_page=50'
-            self.data += self.api(page_endpoint)
+            page_data = self.api(page_endpoint, max_age=self.max_age)
+            if not page_data:
+                break
+            self.data += page_data
             self.progress.emit(len(self.data))
 
+        self.complete = not interrupt()
+
+
+class Prefetcher(Pager):
+    """Pager listing the repositories of an identity in the background,
+    so later searches find the pages already in the API cache. A
+    complete listing is kept as .frame and saved to any snapshot path.
+    Any failure is kept as .error, rather than raised from the slot."""
+
+    def __init__(self, api, identity, max_age=None, snapshot=None):
+        super().__init__(api, identity+'/repos', [], 0, max_age)
+        self.identity = identity
+        self.snapshot = snapshot
+        self.frame = None
+        self.error = None
+
+    @QtCore.Slot()
+    def run(self):
+        try:
+            identity_info = self.api(self.identity, max_age=self.max_age)
+            self.maxlen = (identity_info['public_repos']
+                           + identity_info.get('total_private_repos', 0))
+            self._page()
+        except (OSError, http.client.HTTPException, KeyError,
+                TypeError) as err:
+            # Likely a half typed identity or a dropped connection; the
+            # next edit or search retries.
+            self.error = err
+            self.complete = False
+        if self.complete:
+            self.frame = pd.DataFrame(self.data)
+            if self.snapshot:
+                try:
+                    save_snapshot(self.snapshot, self.frame)
+                except OSError as err:
+                    # The listing is still usable without a snapshot.
+                    self.error = err
+        self.finished.emit()
+
+
+class Exporter(QtCore.QObject):
+    finished = QtCore.Signal()
+    progress = QtCore.Signal(int)
+
+    def __init__(self, api, endpoint, path, enrich=()):
+        super().__init__()
+        self.api = api
+        self.endpoint = endpoint
+        self.path = path
+        self.enrich = enrich
+        self.error = None
+
+    @QtCore.Slot()
+    def run(self):
+
+        interrupt = QtCore.QThread.currentThread().isInterruptionRequested
+
+        try:
+            export_inventory(self.api, self.endpoint, self.path,
+                             enrich=self.enrich,
+                             progress=self.progress.emit,
+                             interrupt=interrupt)
+        except Exception as err:
+            self.error = err
+
         self.finished.emit()
 
 
@@ -121,10 +212,15 @@ class Popup(QtWidgets.QWidget):
 
 
 class MainWindow(QtWidgets.QMainWindow):
+    # Webhook deliveries, passed from the receiver's threads to the GUI.
+    webhook_event = QtCore.Signal(str, object)
 
-    def __init__(self, app=None, parent=None):
+    def __init__(self, app=None, parent=None, diagnostics=None):
         super().__init__(parent)
 
+        if diagnostics:
+            diagnostics.instrument(self)
+
         self.app = app
         self.app.setFont(QtGui.QFont("Lucida Grande", 12))
         
@@ -133,7 +229,10 @@ class MainWindow(QtWidgets.QMainWindow):
         defaults = {'token': None,
                     'Default Type': 'Organization',
                     'Default GitHub Identity': 'fluidityproject',
-                    'Default Repository Pattern': '*'}
+                    'Default Repository Pattern': '*',
+                    'Archive Batch Size': '50',
+                    'Webhook Secret': '',
+                    'Webhook Port': ''}
 
         home = pathlib.Path.home()
         path = home.joinpath('.config', 'github_helper')
@@ -141,10 +240,16 @@ class MainWindow(QtWidgets.QMainWindow):
             os.makedirs(path)
         except FileExistsError:
             pass
+        self._snapshot_dir = path.joinpath('snapshots')
+        os.makedirs(self._snapshot_dir, exist_ok=True)
         path = path.joinpath('config.json')
         
         self.config = Configurator(str(path), defaults)
-        self.api = GithubAPI(error_handler=self._error)
+        self.api = GithubAPI(error_handler=self._error, cachesize=2000)
+
+        self._enrichment_cache = {}
+        self._enrichment_pool = QtCore.QThreadPool(self)
+        self._enrichment_pool.setMaxThreadCount(8)
 
         widget = QtWidgets.QWidget()
         self.setCentralWidget(widget)
@@ -186,6 +291,25 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.layout.addLayout(self.grid)
 
+        self._prefetch_threads = []
+        self._prefetch_timer = QtCore.QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.setInterval(PREFETCH_DELAY)
+        self._prefetch_timer.timeout.connect(self._prefetch)
+        self._identity.textEdited.connect(self._schedule_prefetch)
+        radios[0].toggled.connect(self._schedule_prefetch)
+        # Identity to (repositories, time listed), or None if the
+        # repositories came from a snapshot and are yet to be refreshed.
+        self._inventory = {}
+        self._load_inventory()
+        self._schedule_prefetch()
+
+        self._webhook = None
+        # Team access, kept current by the webhook receiver if running.
+        self._team_inventory = Inventory()
+        self.webhook_event.connect(self._on_webhook)
+        self._start_webhook()
+
         self.buttons = []
 
         self._add_button("Configure Helper Settings", self._config)
@@ -193,6 +317,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self._add_button("Archive Matching Repositories", self._archive)
         self._add_button("Change Team Settings", self._teams)
         self._add_button("Modify Branch Protections", self._protect)
+        self._add_button("Export Repository Inventory", self._export)
         self._add_button("Help", self._help)
 
         for button in self.buttons:
@@ -212,7 +337,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self.progress.quit()
         self.progess = None
 
-        self.repos = matching_repositories(self.repos, self.pattern)
+        self.repos = self._matching()
+        if self.repos is None:
+            return
         self.repos = self.repos.sort_values('name')
 
         N = len(self.repos.index)
@@ -226,10 +353,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         confirmation = QtWidgets.QRadioButton("Confirm this operation")
 
-        model = PandasModel(self.repos[['name']])
-        table = QtWidgets.QListView()
-        table.setModel(model)
-        table.doubleClicked.connect(self._open_repo)
+        table = self._result_table(self.repos)
         
         buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok |
                                              QtWidgets.QDialogButtonBox.Cancel)
@@ -247,10 +371,85 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def _do_archive(self):
         self.api.set_token(self.config['token'])
-        for repo in self.repos.name:
-            print(self.api(f'/repos/{self.owner}/{repo}',
-                           archived=True,
-                           http_method="PATCH"))
+        api = self.api.without_error_handler()
+        try:
+            batch_size = int(self.config['Archive Batch Size'])
+        except ValueError:
+            batch_size = 50
+        columns = [col for col in ('name', 'node_id')
+                   if col in self.repos.columns]
+        results = archive_repositories(api, self.owner,
+                                       self.repos[columns].to_dict('records'),
+                                       batch_size=batch_size)
+
+        failures = {name: msg for name, msg in results.items() if msg}
+        if failures:
+            text = '\n'.join(f'{name}: {msg}' for name, msg
+                             in sorted(failures.items()))
+            QtWidgets.QMessageBox.warning(
+                self, "Archive Repositories",
+                f"{len(failures)} of {len(results)} repositories"
+                f" could not be archived.\n\n{text}")
+        self._forget_inventory()
+
+    def _export(self):
+
+        label = QtWidgets.QLabel("Extra columns to include:")
+        self.export_teams = QtWidgets.QCheckBox("Team permissions")
+        self.export_protected = QtWidgets.QCheckBox(
+            "Default branch protection status")
+
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok |
+                                             QtWidgets.QDialogButtonBox.Cancel)
+
+        self.export_popup = Popup(label, self.export_teams,
+                                  self.export_protected,
+                                  title="Export Repository Inventory",
+                                  bbox=buttons)
+        buttons.accepted.connect(self._do_export)
+        self.export_popup.show()
+
+    def _do_export(self):
+
+        enrich = []
+        if self.export_teams.isChecked():
+            enrich.append('teams')
+        if self.export_protected.isChecked():
+            enrich.append('protected')
+
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export Repository Inventory", f"{self.owner}.csv",
+            "CSV (*.csv);;JSON Lines (*.jsonl);;Parquet (*.parquet)")
+        if not path:
+            return
+
+        self.api.set_token(self.config['token'])
+        identity_info = self.api(self.identity)
+        repo_count = (identity_info['public_repos']
+                      + identity_info.get('total_private_repos', 0))
+
+        # Pages are streamed to the file, so none are worth caching.
+        api = self.api.without_error_handler(cachesize=0)
+        exporter = Exporter(api, self.identity+'/repos', path, enrich)
+
+        self.progress = ProgressDialog(exporter,
+                                       label=f"Exporting {repo_count} repositories",
+                                       canceled_callback=self._cancel_export,
+                                       finished_callback=self._finish_export,
+                                       parent=self)
+        self.progress.setRange(0, repo_count)
+        self.progress.show()
+        self.progress.start()
+
+    def _cancel_export(self):
+        self.progress.interrupt()
+
+    def _finish_export(self):
+        self.progress.quit()
+        err = self.progress.worker.error
+        self.progress = None
+        if err:
+            QtWidgets.QMessageBox.warning(self, "Export failed", str(err))
 
     def _config(self):
 
@@ -281,6 +480,7 @@ class MainWindow(QtWidgets.QMainWindow):
             text = self.configgrid.itemAtPosition(i, 1).widget()
             self.config[label.text()] = text.text()
         self.config._save()
+        self._start_webhook()
 
     def _error(self, error):
 
@@ -346,17 +546,16 @@ class MainWindow(QtWidgets.QMainWindow):
         self.progress.quit()
         self.progess = None
 
-        self.repos = matching_repositories(self.repos, self.pattern, True)
+        self.repos = self._matching(True)
+        if self.repos is None:
+            return
         repos = self.repos.sort_values('name')
 
         label = QtWidgets.QLabel()
         label.setText((f"{len(repos.index)} repositories found.\n"
                        + "Double click repository to view on GitHub."))
 
-        model = PandasModel(repos[['name']])
-        table = QtWidgets.QListView()
-        table.setModel(model)
-        table.doubleClicked.connect(self._open_repo)
+        table = self._result_table(repos)
 
 
         hbox = QtWidgets.QHBoxLayout()
@@ -385,6 +584,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.protect_popup.show()
 
     def _do_protect(self):
+        self._enrichment_cache.clear()
         branch = self.branch_select.text()
         
         for repo in self.repos.name:
@@ -414,19 +614,47 @@ class MainWindow(QtWidgets.QMainWindow):
             
         
     def _search(self):
+        if not self._valid_pattern():
+            return
+        frame, listed = self._inventory.get(self.identity, (None, None))
+        if frame is not None:
+            # Show what we have now; a stale inventory is refreshed
+            # in the background for next time.
+            if listed is None or time.monotonic() - listed > PREFETCH_MAX_AGE:
+                self._prefetch()
+            self.repos = frame
+            self.progress = None
+            self._display_search()
+            return
         self.repos = []
-        self._do_search(self.repos, self._display_search)
-
-    def _do_search(self, data, callback):
+        self._do_search(self.repos, self._display_search,
+                        max_age=PREFETCH_MAX_AGE)
+
+    def _valid_pattern(self):
+        if is_expression(self.pattern):
+            try:
+                compile_filter(self.pattern, REPOSITORY_FIELDS)
+            except FilterError as err:
+                QtWidgets.QMessageBox.warning(self, "Invalid Pattern", str(err))
+                return False
+        return True
+
+    def _do_search(self, data, callback, max_age=None):
+        """List the identity's repositories into data, then call back.
+        Pages fetched within max_age seconds, e.g. by the prefetch, are
+        reused; actions about to modify repositories leave it unset."""
+
+        if not self._valid_pattern():
+            return
 
         self.api.set_token(self.config['token'])
-        identity_info = self.api(self.identity)
+        identity_info = self.api(self.identity, max_age=max_age)
         repo_count = (identity_info['public_repos']
                       + identity_info.get('total_private_repos', 0))
 
         pager = Pager(self.api,
                       self.identity+'/repos',
-                      data, repo_count)
+                      data, repo_count, max_age=max_age)
 
         label = f"Checking {repo_count} repositories"
         self.progress = ProgressDialog(pager,
@@ -438,6 +666,131 @@ class MainWindow(QtWidgets.QMainWindow):
         self.progress.show()
         self.progress.start()
 
+    def _schedule_prefetch(self, *args):
+        """Restart the countdown to a background listing, so that one
+        starts only once the identity stops changing."""
+        self._stop_prefetch()
+        self._prefetch_timer.start()
+
+    def _stop_prefetch(self):
+        for thread, _ in self._prefetch_threads:
+            thread.requestInterruption()
+
+    def _load_inventory(self):
+        """Map in any saved snapshot for the current identity."""
+        if self.identity in self._inventory:
+            return
+        loaded = load_snapshot(snapshot_path(self._snapshot_dir,
+                                             self.identity))
+        if loaded:
+            self._inventory[self.identity] = (loaded[0], None)
+
+    def _forget_inventory(self):
+        """Drop the current identity's inventory after modifying its
+        repositories, stopping any listing that may predate the change,
+        so the next search lists them again."""
+        self._stop_prefetch()
+        self._inventory.pop(self.identity, None)
+
+    def _prefetch(self):
+        if not self.owner:
+            return
+        # An interrupted listing will not complete, so does not count.
+        if any(worker.identity == self.identity and thread.isRunning()
+               and not thread.isInterruptionRequested()
+               for thread, worker in self._prefetch_threads):
+            return
+        self._load_inventory()
+        self.api.set_token(self.config['token'])
+        api = self.api.without_error_handler()
+
+        thread = QtCore.QThread()
+        worker = Prefetcher(api, self.identity, max_age=PREFETCH_MAX_AGE,
+                            snapshot=snapshot_path(self._snapshot_dir,
+                                                   self.identity))
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(self._prefetch_done)
+        self._prefetch_threads.append((thread, worker))
+        thread.start()
+
+    def _prefetch_done(self):
+        for thread, worker in self._prefetch_threads:
+            if thread.isFinished() and worker.complete:
+                self._inventory[worker.identity] = (worker.frame,
+                                                    time.monotonic())
+        self._prefetch_threads = [(thread, worker) for thread, worker
+                                  in self._prefetch_threads
+                                  if not thread.isFinished()]
+
+    def _start_webhook(self):
+        """(Re)start the webhook receiver if a secret and port are
+        configured, so repository and team changes pushed by GitHub
+        update the inventory without polling."""
+        if self._webhook:
+            self._webhook.stop()
+            self._webhook = None
+        secret = self.config.get('Webhook Secret')
+        port = self.config.get('Webhook Port')
+        # Team lists loaded while nothing was listening may be stale.
+        self._team_inventory = Inventory()
+        if not (secret and port):
+            return
+        try:
+            self._webhook = WebhookReceiver(self._team_inventory, secret,
+                                            port=int(port),
+                                            callback=self.webhook_event.emit)
+        except (ValueError, OSError) as err:
+            QtWidgets.QMessageBox.warning(self, "Webhook Receiver",
+                                          f"Could not listen on port {port}:"
+                                          f" {err}")
+            return
+        self._webhook.start()
+
+    def _on_webhook(self, event, payload):
+        repo = payload.get('repository') or {}
+        if event != 'repository':
+            # The receiver has applied team access to _team_inventory,
+            # so only the teams column needs fetching again.
+            self._drop_enrichments('teams', repo.get('full_name'))
+            return
+        self.api.expire_cache()
+        self._drop_enrichments(full_name=repo.get('full_name'))
+        owner = (repo.get('owner') or {}).get('login', '').lower()
+        for identity, (frame, listed) in list(self._inventory.items()):
+            if identity.rsplit('/', 1)[-1].lower() == owner:
+                frame = update_frame(frame, payload.get('action'), repo)
+                self._inventory[identity] = (frame, listed)
+
+    def _drop_enrichments(self, name=None, full_name=None):
+        """Drop cached extra columns, of one name or all, for one
+        repository or all."""
+        for key in list(self._enrichment_cache):
+            if name in (None, key[0]) and full_name in (None, key[1]):
+                del self._enrichment_cache[key]
+
+    def _team_repositories(self):
+        """Return a frame of the ids of the chosen team's repositories,
+        listing them only if webhook deliveries are not keeping them."""
+        inventory = self._team_inventory
+        if not (self._webhook and inventory.has_team(self.team_id)):
+            repos = self.api(f'/teams/{self.team_id}/repos?per_page=200')
+            if not isinstance(repos, list):
+                return pd.DataFrame(columns=['id'])
+            inventory.load_team(self.team_id, repos)
+        ids = list(inventory.team_repositories(self.team_id))
+        return pd.DataFrame({'id': pd.Series(ids, dtype='int64')})
+
+    def closeEvent(self, event):
+        if self._webhook:
+            self._webhook.stop()
+            self._webhook = None
+        self._stop_prefetch()
+        for thread, _ in self._prefetch_threads:
+            thread.wait()
+        super().closeEvent(event)
+
     def _cancel_search(self):
         self.progress.worker.finished.disconnect()
         self.progress.interrupt()
@@ -445,21 +798,20 @@ class MainWindow(QtWidgets.QMainWindow):
         self._skip_search = True
 
     def _display_search(self):
-        self.progress.quit()
+        if self.progress:
+            self.progress.quit()
         self.progess = None
 
-        self.repos = matching_repositories(self.repos, self.pattern, True)
+        self.repos = self._matching(True)
+        if self.repos is None:
+            return
         repos = self.repos.sort_values('name')
 
         label = QtWidgets.QLabel()
         label.setText((f"{len(repos.index)} repositories found.\n"
                        + "Double click repository to view on GitHub."))
 
-        model = PandasModel(repos[['name']])
-        table = QtWidgets.QListView()
-        table.setModel(model)
-
-        table.doubleClicked.connect(self._open_repo)
+        table = self._result_table(repos)
 
         buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok)
 
@@ -467,6 +819,43 @@ class MainWindow(QtWidgets.QMainWindow):
                                   title="Matching Repositories", bbox=buttons)
         self.search_popup.show()
 
+    def _matching(self, show_archived=False):
+        """Select the listed repositories matching the pattern, or warn
+        and return None if it does not apply to them. A complete listing
+        is kept as the identity's inventory, so later searches reuse it
+        and its filter index."""
+        if type(self.repos) is not pd.DataFrame:
+            self.repos = pd.DataFrame(self.repos)
+            if self.progress and self.progress.worker.complete:
+                self._inventory[self.identity] = (self.repos,
+                                                  time.monotonic())
+        try:
+            return matching_repositories(self.repos, self.pattern,
+                                         show_archived)
+        except FilterError as err:
+            QtWidgets.QMessageBox.warning(self, "Invalid Pattern", str(err))
+            return None
+
+    def _result_table(self, repos):
+        """Table of repositories, with extra columns fetched only for
+        the rows scrolled into view."""
+
+        api = self.api.without_error_handler()
+        enrichments = {'protected': functools.partial(branch_protection, api),
+                       'teams': functools.partial(team_permissions, api)}
+
+        model = EnrichedModel(repos[['name', 'default_branch']], repos,
+                              enrichments, cache=self._enrichment_cache,
+                              pool=self._enrichment_pool)
+        table = QtWidgets.QTableView()
+        table.setModel(model)
+        table.verticalHeader().hide()
+        table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.doubleClicked.connect(self._open_repo)
+        model.attach(table)
+        return table
+
     def _open_repo(self, index):
         repos = self.repos.sort_values('name')
         repo = repos.html_url.iloc[index.row()]
@@ -518,20 +907,16 @@ Team to modify:""")
         
     def _add_team(self):
         self.repos = []
-        self.team_repos = self.api(f'/teams/{self.team_id}/repos?per_page=200')
-        if self.team_repos:
-            self.team_repos = pd.io.json.json_normalize(self.team_repos,
-                                                        max_level=0)
-        else:
-            self.team_repos = pd.DataFrame(columns=['id'])
-        
+        self.team_repos = self._team_repositories()
         self._do_search(self.repos, self._confirm_add_team)
 
     def _confirm_add_team(self):
         self.progress.quit()
         self.progess = None
 
-        self.repos = matching_repositories(self.repos, self.pattern)
+        self.repos = self._matching()
+        if self.repos is None:
+            return
         print(self.repos.columns)
         self.repos = self.repos.loc[~self.repos.id.isin(self.team_repos.id)]
         self.repos = self.repos.sort_values('name')
@@ -542,11 +927,7 @@ Team to modify:""")
         label.setText((f"Add team {self.team} to {N} repositories?\n"
                        + "Double click repository to view on GitHub."))
 
-        model = PandasModel(self.repos[['name']])
-        table = QtWidgets.QListView()
-        table.setModel(model)
-
-        table.doubleClicked.connect(self._open_repo)
+        table = self._result_table(self.repos)
 
         groupbox = QtWidgets.QGroupBox("Permission:")
         self.team_permission = QtWidgets.QButtonGroup()
@@ -571,6 +952,7 @@ Team to modify:""")
         self.search_popup.show()
 
     def _do_add_team(self):
+        self._enrichment_cache.clear()
         owner = self._identity.text()
         permission = ('pull', 'push', 'admin')[self.team_permission.checkedId()]
         print(self._teams.columns)
@@ -579,19 +961,21 @@ Team to modify:""")
             print(self.api(f'/teams/{self.team_id}/repos/{owner}/{repo}',
                            http_method='PUT',
                            permission=permission))
+        self._forget_inventory()
+        self._team_inventory.forget_team(self.team_id)
 
     def _remove_team(self):
         self.repos = []
-        self.team_repos = self.api(f'/teams/{self.team_id}/repos?per_page=200')
-        self.team_repos=pd.io.json.json_normalize(self.team_repos,
-                                                  max_level=0)
+        self.team_repos = self._team_repositories()
         self._do_search(self.repos, self._confirm_remove_team)
 
     def _confirm_remove_team(self):
         self.progress.quit()
         self.progess = None
 
-        self.repos = matching_repositories(self.repos, self.pattern)
+        self.repos = self._matching()
+        if self.repos is None:
+            return
         self.repos = self.repos.loc[self.repos.id.isin(self.team_repos.id)]
         self.repos = self.repos.sort_values('name')
 
@@ -601,10 +985,7 @@ Team to modify:""")
         label.setText((f"Remove team {self.team} from {N} repositories?\n"
                        + "Double click repository to view on GitHub."))
 
-        model = PandasModel(self.repos[['name']])
-        table = QtWidgets.QListView()
-        table.setModel(model)
-        table.doubleClicked.connect(self._open_repo)
+        table = self._result_table(self.repos)
         
         buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok |
                                              QtWidgets.QDialogButtonBox.Cancel)
@@ -616,7 +997,10 @@ Team to modify:""")
         self.search_popup.show()        
 
     def _do_remove_team(self):
+        self._enrichment_cache.clear()
         owner = self._identity.text()
         for repo in self.repos.name:
             self.api(f'/teams/{self.team_id}/repos/{owner}/{repo}',
                      http_method="DELETE")
+        self._forget_inventory()
+        self._team_inventory.forget_team(self.team_id)
@@ -0,0 +1,199 @@
+"""Module saving a repository inventory as a compact binary snapshot,
+which is memory mapped on load so that a large inventory is available
+almost immediately at startup.
+
+The file holds a header, a column table, fixed width column data and a
+table of the distinct strings, which text columns index into:
+
+    header      magic, version, column count, row count, save time
+    columns     per column: name, kind, byte offset of its data
+    data        int64 / float64 / bool / datetime64[ns] / uint32 index
+    strings     count, byte length, NUL separated utf-8 text
+
+Index 0 of the string table is reserved for missing values. List
+columns, such as topics, are stored as strings joined with a unit
+separator. Splitting the whole string table at once, rather than
+decoding strings one by one, keeps loading fast.
+"""
+
+import mmap
+import os
+import pathlib
+import struct
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from .filters import REPOSITORY_FIELDS
+
+__all__ = ['save_snapshot', 'load_snapshot', 'snapshot_path']
+
+MAGIC = b'GHSNAP\0\0'
+VERSION = 2
+
+_HEADER = struct.Struct('<8sHHId')
+_COLUMN = struct.Struct('<32scxxxQ')
+_SEPARATOR = '\x1f'
+
+# Snapshot column kinds: q int64, d float64, ? bool, M datetime64[ns],
+# S string, L list of strings.
+_KINDS = {'string': 'S', 'list': 'L', 'bool': '?', 'number': 'q',
+          'date': 'M'}
+
+# Every field a filter may test is kept, so that an inventory loaded
+# from a snapshot answers the same expressions as a fresh listing.
+SNAPSHOT_COLUMNS = {name: _KINDS[kind]
+                    for name, kind in REPOSITORY_FIELDS.items()}
+
+_DTYPES = {'q': np.dtype('<i8'),
+           'd': np.dtype('<f8'),
+           '?': np.dtype('?'),
+           'M': np.dtype('<i8'),
+           'S': np.dtype('<u4'),
+           'L': np.dtype('<u4')}
+
+
+def snapshot_path(directory, identity):
+    """Return the snapshot file for an identity such as /orgs/name."""
+    name = identity.strip('/').replace('/', '_')
+    return pathlib.Path(directory).joinpath(f'{name}.ghsnap')
+
+
+class _Strings():
+
+    def __init__(self):
+        self.index = {None: 0}
+        self.values = ['']
+
+    def add(self, value):
+        if not isinstance(value, str):
+            return 0
+        value = value.replace('\0', '')
+        if value not in self.index:
+            self.index[value] = len(self.values)
+            self.values.append(value)
+        return self.index[value]
+
+    def encode(self):
+        blob = '\0'.join(self.values).encode('utf-8')
+        return struct.pack('<II', len(self.values), len(blob)) + blob
+
+
+def _column_data(kind, column, strings):
+    if kind == 'S':
+        return np.array([strings.add(value) for value in column],
+                        dtype=_DTYPES[kind])
+    if kind == 'L':
+        return np.array([strings.add(_SEPARATOR.join(value)
+                                     if isinstance(value, (list, tuple))
+                                     else None)
+                         for value in column], dtype=_DTYPES[kind])
+    if kind == 'M':
+        values = pd.to_datetime(column, utc=True).dt.tz_localize(None)
+        return values.values.astype('datetime64[ns]').view('<i8')
+    if kind == '?':
+        return column.fillna(False).values.astype(_DTYPES[kind])
+    return pd.to_numeric(column).fillna(0).values.astype(_DTYPES[kind])
+
+
+def save_snapshot(path, repos):
+    """Write a DataFrame, or list of dicts, of repositories to path."""
+
+    if not isinstance(repos, pd.DataFrame):
+        repos = pd.DataFrame(list(repos))
+    columns = [(name, kind) for name, kind in SNAPSHOT_COLUMNS.items()
+               if name in repos.columns]
+    strings = _Strings()
+    data = [_column_data(kind, repos[name], strings)
+            for name, kind in columns]
+
+    offset = _HEADER.size + _COLUMN.size*len(columns)
+    table = []
+    for (name, kind), values in zip(columns, data):
+        offset += -offset % 8
+        table.append(_COLUMN.pack(name.encode('utf-8'), kind.encode(),
+                                  offset))
+        offset += values.nbytes
+
+    path = pathlib.Path(path)
+    # A unique temporary file, so concurrent saves cannot interleave.
+    handle, tmp = tempfile.mkstemp(prefix=path.name, suffix='.tmp',
+                                   dir=path.parent)
+    with open(handle, 'wb') as outfile:
+        outfile.write(_HEADER.pack(MAGIC, VERSION, len(columns),
+                                   len(repos.index), time.time()))
+        outfile.write(b''.join(table))
+        for values in data:
+            outfile.write(b'\0' * (-outfile.tell() % 8))
+            outfile.write(values.tobytes())
+        outfile.write(strings.encode())
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        os.unlink(tmp)
+        raise
+
+
+def load_snapshot(path):
+    """Map a snapshot file into a DataFrame of repositories.
+
+    Returns a (DataFrame, save time) pair, or None if there is no
+    readable snapshot of the current version at path, including when
+    the file is truncated or corrupt.
+    """
+
+    try:
+        with open(path, 'rb') as infile:
+            buffer = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    try:
+        return _load(buffer)
+    except (struct.error, KeyError, UnicodeDecodeError, IndexError,
+            ValueError):
+        return None
+
+
+def _load(buffer):
+    magic, version, ncols, nrows, saved = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    columns = []
+    end = table_end = _HEADER.size + _COLUMN.size*ncols
+    for count in range(ncols):
+        name, kind, offset = _COLUMN.unpack_from(
+            buffer, _HEADER.size + _COLUMN.size*count)
+        kind = kind.decode()
+        size = _DTYPES[kind].itemsize*nrows
+        if offset < table_end or offset + size > len(buffer):
+            raise IndexError(f'Column {count} outside the snapshot')
+        columns.append((name.rstrip(b'\0').decode('utf-8'), kind, offset))
+        end = max(end, offset + size)
+
+    nstrings, length = struct.unpack_from('<II', buffer, end)
+    start = end + 8
+    if start + length > len(buffer):
+        raise IndexError('String table outside the snapshot')
+    strings = np.empty(nstrings, dtype=object)
+    strings[:] = buffer[start:start+length].decode('utf-8').split('\0')
+    strings[0] = None
+
+    frame = {}
+    for name, kind, offset in columns:
+        values = np.frombuffer(buffer, _DTYPES[kind], nrows, offset)
+        if kind == 'S':
+            values = strings[values]
+        elif kind == 'L':
+            used, inverse = np.unique(values, return_inverse=True)
+            lists = np.empty(len(used), dtype=object)
+            lists[:] = [strings[index].split(_SEPARATOR)
+                        if strings[index] else [] for index in used]
+            values = lists[inverse]
+        elif kind == 'M':
+            values = values.view('datetime64[ns]')
+        frame[name] = values
+    return pd.DataFrame(frame), saved
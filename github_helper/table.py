@@ -36,3 +36,128 @@ class PandasModel(QtCore.QAbstractTableModel):
         if return_header:
             return self._data.columns[col]
         return None
+
+
+class _Relay(QtCore.QObject):
+    """Carries results from pool threads back to the model's thread."""
+    fetched = QtCore.Signal(object, object, object)
+
+
+class _Fetch(QtCore.QRunnable):
+
+    def __init__(self, model, row, column):
+        super().__init__()
+        self.model = model
+        self.row = row
+        self.column = column
+
+    def run(self):
+        model = self.model
+        if not model.wanted(self.row):
+            # Scrolled away before we started; leave for a later request.
+            model.relay.fetched.emit(self.row, self.column, model.SKIPPED)
+            return
+        try:
+            value = model.enrichments[self.column](model.record(self.row))
+        except Exception:
+            value = None
+        model.relay.fetched.emit(self.row, self.column, value)
+
+
+class EnrichedModel(PandasModel):
+    """
+    Table model appending columns which are expensive to compute, such
+    as ones needing API calls. Values are fetched in a thread pool only
+    for rows requested by a view, via attach(), and kept in a cache
+    which may be shared between models.
+    """
+
+    PENDING = '…'
+    SKIPPED = object()
+
+    def __init__(self, data, source, enrichments, cache=None,
+                 pool=None, parent=None):
+        super().__init__(data, parent)
+        self._source = source
+        self.enrichments = enrichments
+        self._names = list(enrichments)
+        self._cache = {} if cache is None else cache
+        self._pending = set()
+        self._window = (0, -1)
+        self._pool = pool or QtCore.QThreadPool.globalInstance()
+        self.relay = _Relay()
+        self.relay.fetched.connect(self._fetched)
+
+    def columnCount(self, parent=None):
+        return super().columnCount(parent) + len(self._names)
+
+    def record(self, row):
+        """Return the source fields of a row as a dict."""
+        return self._source.iloc[row].to_dict()
+
+    def _key(self, row, name):
+        if 'full_name' in self._source.columns:
+            return name, self._source.full_name.iloc[row]
+        return name, row
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        offset = index.column() - super().columnCount()
+        if offset < 0 or not index.isValid():
+            return super().data(index, role)
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        key = self._key(index.row(), self._names[offset])
+        if key not in self._cache:
+            return self.PENDING
+        value = self._cache[key]
+        return '' if value is None else str(value)
+
+    def headerData(self, col, orientation, role):
+        offset = col - super().columnCount()
+        if (offset >= 0 and orientation == QtCore.Qt.Horizontal
+                and role == QtCore.Qt.DisplayRole):
+            return self._names[offset]
+        return super().headerData(col, orientation, role)
+
+    def wanted(self, row):
+        return self._window[0] <= row <= self._window[1]
+
+    def request_rows(self, first, last):
+        """Fetch any missing values for rows first to last inclusive."""
+        last = min(last, self.rowCount() - 1)
+        self._window = (first, last)
+        for row in range(first, last + 1):
+            for name in self._names:
+                key = self._key(row, name)
+                if key in self._cache or (row, name) in self._pending:
+                    continue
+                self._pending.add((row, name))
+                self._pool.start(_Fetch(self, row, name))
+
+    def _fetched(self, row, name, value):
+        self._pending.discard((row, name))
+        if value is self.SKIPPED:
+            return
+        self._cache[self._key(row, name)] = value
+        col = super().columnCount() + self._names.index(name)
+        index = self.index(row, col)
+        self.dataChanged.emit(index, index)
+
+    def attach(self, view, prefetch=20):
+        """Request the rows visible in view, plus prefetch more below,
+        whenever it scrolls or is resized."""
+
+        def update(*args):
+            viewport = view.viewport()
+            first = view.indexAt(QtCore.QPoint(0, 0)).row()
+            last = view.indexAt(QtCore.QPoint(0, viewport.height() - 1)).row()
+            if first < 0:
+                first = 0
+            if last < 0:
+                last = self.rowCount() - 1
+            self.request_rows(first, last + prefetch)
+
+        scrollbar = view.verticalScrollBar()
+        scrollbar.valueChanged.connect(update)
+        scrollbar.rangeChanged.connect(update)
+        QtCore.QTimer.singleShot(0, update)
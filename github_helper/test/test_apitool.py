@@ -1,13 +1,30 @@
+import http.client
+import io
+import json
 import os
+import socket
+import threading
+import time
+from collections import deque
 from urllib import error
 
-from pytest import fixture, mark
+from pytest import fixture, mark, raises
 
-from github_helper import apitool
+from github_helper import apitool, cassette
 
 @fixture(scope="module")
 def api():
-    return apitool.GithubAPI(token=os.environ['GISTTOKEN'])
+    """Live API, recorded to or replayed from GITHUB_HELPER_CASSETTE
+    if that is set."""
+    path = os.environ.get('GITHUB_HELPER_CASSETTE')
+    if path and 'GISTTOKEN' not in os.environ:
+        yield apitool.GithubAPI(transport=cassette.ReplayTransport(path, 0))
+    elif path:
+        with cassette.RecordingTransport(path) as recorder:
+            yield apitool.GithubAPI(token=os.environ['GISTTOKEN'],
+                                    transport=recorder)
+    else:
+        yield apitool.GithubAPI(token=os.environ['GISTTOKEN'])
 
 @fixture(scope="module")
 def state():
@@ -41,3 +58,160 @@ def test_GithubAPI_delete_call(api, state):
             raise err
     
     
+
+class FakeResponse(io.BytesIO):
+    """Minimal stand in for an http.client.HTTPResponse."""
+
+    def __init__(self, data, headers=None):
+        body = json.dumps(data).encode('utf-8')
+        super().__init__(body)
+        self.length = len(body)
+        self.headers = headers or {}
+
+def test_GithubAPI_coalesces_concurrent_gets(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def urlopen(req):
+        calls.append(req.full_url)
+        release.wait(5)
+        return FakeResponse({"login": "octocat"})
+
+    monkeypatch.setattr(apitool.request, 'urlopen', urlopen)
+    api = apitool.GithubAPI()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(api('/users/octocat')))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while not calls:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"login": "octocat"}]*5
+
+def test_ResponseCache_evicts_oldest():
+    cache = apitool.ResponseCache(maxsize=2)
+    for key in 'abc':
+        cache[key] = key
+    assert 'a' not in cache
+    assert cache['c'] == 'c'
+
+def flaky_urlopen(failures, calls):
+    """Return a fake urlopen raising the given errors, then succeeding."""
+    failures = deque(failures)
+
+    def urlopen(req):
+        calls.append(req.get_method())
+        if failures:
+            raise failures.popleft()
+        return FakeResponse({"ok": True})
+    return urlopen
+
+def gateway_error():
+    return error.HTTPError('https://api.github.com/', 503,
+                           'Service Unavailable', {}, None)
+
+def test_GithubAPI_retries_idempotent(monkeypatch):
+    calls = []
+    monkeypatch.setattr(apitool.request, 'urlopen',
+                        flaky_urlopen([gateway_error(), ConnectionResetError()],
+                                      calls))
+    policy = apitool.RetryPolicy(sleep=lambda delay: None)
+    api = apitool.GithubAPI(retry_policy=policy)
+
+    assert api('/repos/org/repo', http_method='PATCH', archived=True) == {"ok": True}
+    assert len(calls) == 3
+    assert policy.stats['retries'] == 2
+    assert policy.stats['recovered'] == 1
+
+def test_GithubAPI_does_not_retry_post(monkeypatch):
+    calls = []
+    monkeypatch.setattr(apitool.request, 'urlopen',
+                        flaky_urlopen([gateway_error()], calls))
+    policy = apitool.RetryPolicy(sleep=lambda delay: None)
+    api = apitool.GithubAPI(retry_policy=policy)
+
+    with raises(error.HTTPError):
+        api('/gists', description='test')
+    assert calls == ['POST']
+    assert policy.stats['retries'] == 0
+
+def test_RetryPolicy_budget():
+    policy = apitool.RetryPolicy(budget=2, sleep=lambda delay: None)
+    err = gateway_error()
+    assert policy.should_retry(err, 0, True)
+    assert policy.should_retry(err, 0, True)
+    assert not policy.should_retry(err, 0, True)
+    assert policy.stats['over_budget'] == 1
+    assert 0 <= policy.delay(10) <= policy.max_backoff
+
+def test_GithubAPI_max_age(monkeypatch):
+    calls = []
+    monkeypatch.setattr(apitool.request, 'urlopen', flaky_urlopen([], calls))
+    api = apitool.GithubAPI()
+
+    api('/users/octocat')
+    assert api('/users/octocat', max_age=60) == {"ok": True}
+    assert len(calls) == 1
+    api('/users/octocat', max_age=0)
+    assert len(calls) == 2
+
+def test_GithubAPI_write_expires_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(apitool.request, 'urlopen', flaky_urlopen([], calls))
+    api = apitool.GithubAPI()
+
+    api('/orgs/org/repos?page=1&per_page=50')
+    api('/repos/org/repo', http_method='PATCH', archived=True)
+    api('/orgs/org/repos?page=1&per_page=50', max_age=60)
+    assert calls == ['GET', 'PATCH', 'GET']
+
+def test_GithubAPI_without_error_handler():
+    api = apitool.GithubAPI(error_handler=print)
+    quiet = api.without_error_handler()
+    assert quiet.error_handler is None
+    assert api.error_handler is print
+    assert quiet._cache is api._cache
+
+def test_GithubAPI_uncached_copy(monkeypatch):
+    calls = []
+    monkeypatch.setattr(apitool.request, 'urlopen', flaky_urlopen([], calls))
+    api = apitool.GithubAPI(cachesize=10)
+    api('/users/octocat')
+    uncached = api.without_error_handler(cachesize=0)
+    for page in range(1, 4):
+        uncached(f'/orgs/org/repos?page={page}&per_page=50')
+    assert '/users/octocat' in api._cache
+    assert len(api._cache._data) == 1
+    assert len(uncached._cache._data) == 0
+
+def test_RetryPolicy_transient():
+    policy = apitool.RetryPolicy()
+    assert policy.is_transient(error.URLError(ConnectionResetError()))
+    assert policy.is_transient(error.URLError(socket.timeout()))
+    assert not policy.is_transient(error.URLError(socket.gaierror()))
+    assert not policy.is_transient(error.URLError('certificate verify failed'))
+
+def test_GithubAPI_retries_failed_read(monkeypatch):
+    calls = []
+
+    class BrokenResponse(FakeResponse):
+        def read(self, *args):
+            raise http.client.IncompleteRead(b'{"ok"')
+
+    def urlopen(req):
+        calls.append(req.full_url)
+        if len(calls) == 1:
+            return BrokenResponse({"ok": True})
+        return FakeResponse({"ok": True})
+
+    monkeypatch.setattr(apitool.request, 'urlopen', urlopen)
+    api = apitool.GithubAPI(retry_policy=apitool.RetryPolicy(sleep=lambda delay: None))
+    assert api('/users/octocat') == {"ok": True}
+    assert len(calls) == 2
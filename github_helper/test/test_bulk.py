@@ -0,0 +1,67 @@
+from urllib import error
+
+from github_helper import bulk
+
+
+class FakeAPI():
+    """Fake API archiving by GraphQL, except for repositories named in
+    graphql_failures, and recording REST fallbacks."""
+
+    def __init__(self, graphql_failures=(), graphql_down=False):
+        self.graphql_failures = graphql_failures
+        self.graphql_down = graphql_down
+        self.queries = []
+        self.rest = []
+
+    def graphql(self, query, **variables):
+        self.queries.append(query)
+        if self.graphql_down:
+            raise error.HTTPError('/graphql', 502, 'Bad Gateway', {}, None)
+        data, errors = {}, []
+        for alias, node_id in variables.items():
+            if node_id in self.graphql_failures:
+                data[alias] = None
+                errors.append({'path': [alias], 'message': 'NOT_FOUND'})
+            else:
+                data[alias] = {'repository': {'isArchived': True}}
+        return {'data': data, 'errors': errors}
+
+    def __call__(self, url, http_method=None, **data):
+        self.rest.append(url)
+        if url.endswith('/bad'):
+            raise error.HTTPError(url, 403, 'Forbidden', {}, None)
+        if url.endswith('/reset'):
+            raise ConnectionResetError('Connection reset by peer')
+        return {'archived': True}
+
+
+def repos(n):
+    return [{'name': f'repo{i}', 'node_id': f'id{i}'} for i in range(n)]
+
+
+def test_archive_batches():
+    api = FakeAPI()
+    results = bulk.archive_repositories(api, 'org', repos(120), batch_size=50)
+    assert len(api.queries) == 3
+    assert api.rest == []
+    assert all(msg is None for msg in results.values())
+    assert len(results) == 120
+
+
+def test_archive_partial_failure_falls_back():
+    api = FakeAPI(graphql_failures=('id3',))
+    items = repos(5) + [{'name': 'bad', 'node_id': None},
+                        {'name': 'reset'}]
+    results = bulk.archive_repositories(api, 'org', items, batch_size=10)
+    assert api.rest == ['/repos/org/bad', '/repos/org/reset',
+                        '/repos/org/repo3']
+    assert results['repo3'] is None
+    assert 'Forbidden' in results['bad']
+    assert 'reset' in results['reset']
+
+
+def test_archive_graphql_down():
+    api = FakeAPI(graphql_down=True)
+    results = bulk.archive_repositories(api, 'org', repos(3))
+    assert len(api.rest) == 3
+    assert set(results.values()) == {None}
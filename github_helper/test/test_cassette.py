@@ -0,0 +1,45 @@
+from urllib import error
+
+from pytest import raises
+
+from github_helper import apitool, cassette
+
+
+class FakeServer():
+    """Fake transport serving one repository, honouring ETags."""
+
+    def __call__(self, req):
+        if req.get_header('If-none-match') == '"v1"':
+            raise error.HTTPError(req.full_url, 304, 'Not Modified',
+                                  {'ETag': '"v1"'}, None)
+        if req.full_url.endswith('/missing'):
+            raise error.HTTPError(req.full_url, 404, 'Not Found', {}, None)
+        return cassette.CassetteResponse(200, [('ETag', '"v1"')],
+                                         b'{"name": "repo"}')
+
+
+def test_record_and_replay(tmpdir):
+    path = str(tmpdir.join('cassette.json'))
+
+    with cassette.RecordingTransport(path, FakeServer()) as recorder:
+        api = apitool.GithubAPI(token='secret', transport=recorder)
+        assert api('/repos/org/repo') == {'name': 'repo'}
+        assert api('/repos/org/repo') == {'name': 'repo'}
+        with raises(error.HTTPError):
+            api('/repos/org/missing')
+    assert 'secret' not in tmpdir.join('cassette.json').read()
+
+    sleeps = []
+    replay = cassette.ReplayTransport(path, latency_scale=2.0,
+                                      sleep=sleeps.append)
+    api = apitool.GithubAPI(transport=replay)
+    assert api('/repos/org/repo') == {'name': 'repo'}
+    assert api('/repos/org/repo') == {'name': 'repo'}
+    with raises(error.HTTPError) as err:
+        api('/repos/org/missing')
+    assert err.value.code == 404
+    assert replay.replayed == 3
+    assert len(sleeps) == 3
+
+    with raises(cassette.CassetteError):
+        api('/repos/org/other')
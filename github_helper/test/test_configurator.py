@@ -29,3 +29,13 @@ def test_configurator(tmpdir):
     test2 = config.Configurator(path, {"name":"test"})
 
     assert test2['name'] == "test2"
+
+
+def test_configurator_new_defaults(tmpdir):
+    path = tmpdir.join("test.json")
+    path.write(json.dumps({"name": "saved"}))
+
+    test = config.Configurator(path, {"name": "test", "Webhook Port": ""})
+
+    assert test['name'] == "saved"
+    assert test['Webhook Port'] == ""
@@ -0,0 +1,67 @@
+import json
+import threading
+import time
+
+from pytest import fixture
+
+from qtpy.QtWidgets import QApplication
+
+from github_helper import diagnostics
+
+
+@fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+@fixture
+def diag(app, tmpdir):
+    return diagnostics.Diagnostics(str(tmpdir.join('report.json')),
+                                   interval=10, threshold=20, profile=True)
+
+
+def test_from_environment():
+    assert diagnostics.Diagnostics.from_environment([], {}) is None
+    diag = diagnostics.Diagnostics.from_environment(
+        ['github_helper', '--diagnostics=out.json'], {})
+    assert diag.path == 'out.json'
+    assert diag._profiler is None
+
+
+def test_wrap_records_handlers_and_stalls(diag):
+
+    def handler(index):
+        time.sleep(0.05)
+        return index
+
+    wrapped = diag.wrap(handler, 'handler')
+    diag.start()
+    # Extra signal arguments are discarded.
+    assert wrapped(1, True) == 1
+    diag._tick()
+
+    assert diag.handlers['handler']['calls'] == 1
+    assert diag.handlers['handler']['max_ms'] >= 50
+    assert diag.stalls[0]['handlers'] == ['handler']
+    assert diag.stalls[0]['duration_ms'] >= 20
+
+    diag.write()
+    with open(diag.path) as infile:
+        report = json.load(infile)
+    assert 'handler' in report['handlers']
+    assert report['profile']
+
+
+def test_disabled_by_zero():
+    for value in ('', '0'):
+        environ = {'GITHUB_HELPER_DIAGNOSTICS': value,
+                   'GITHUB_HELPER_PROFILE': value}
+        assert diagnostics.Diagnostics.from_environment([], environ) is None
+
+
+def test_wrap_ignores_worker_threads(diag):
+    wrapped = diag.wrap(lambda: None, 'handler')
+    thread = threading.Thread(target=wrapped)
+    thread.start()
+    thread.join()
+    assert 'handler' not in diag.handlers
+    assert diag._depth == 0
@@ -0,0 +1,55 @@
+import csv
+import json
+
+from github_helper import export
+
+
+class PagedAPI():
+    """Fake API serving a fixed list of repositories in pages."""
+
+    def __init__(self, repos):
+        self.repos = repos
+        self.calls = []
+
+    def __call__(self, url, *args, **kwargs):
+        self.calls.append(url)
+        if '/teams' in url:
+            return [{'slug': 'devs', 'permission': 'push'}]
+        if '/branches/' in url:
+            return {'protected': True}
+        query = dict(item.split('=') for item in url.split('?')[1].split('&'))
+        page, per_page = int(query['page']), int(query['per_page'])
+        return self.repos[(page-1)*per_page:page*per_page]
+
+
+def repos(n):
+    return [{'id': i, 'name': f'repo{i}', 'full_name': f'org/repo{i}',
+             'default_branch': 'master', 'topics': ['a', 'b']}
+            for i in range(n)]
+
+
+def test_export_csv(tmpdir):
+    path = tmpdir.join('out.csv')
+    api = PagedAPI(repos(7))
+    counts = []
+    assert export.export_inventory(api, '/orgs/org/repos', str(path),
+                                   columns=('id', 'name', 'topics'),
+                                   per_page=3, progress=counts.append) == 7
+    assert counts == [3, 6, 7]
+    with open(path) as infile:
+        rows = list(csv.DictReader(infile))
+    assert [row['name'] for row in rows] == [f'repo{i}' for i in range(7)]
+    assert json.loads(rows[0]['topics']) == ['a', 'b']
+
+
+def test_export_jsonl_enriched(tmpdir):
+    path = tmpdir.join('out.jsonl')
+    api = PagedAPI(repos(4))
+    export.export_inventory(api, '/orgs/org/repos', str(path),
+                            columns=('name',), enrich=('teams', 'protected'),
+                            per_page=2)
+    with open(path) as infile:
+        rows = [json.loads(line) for line in infile]
+    assert len(rows) == 4
+    assert rows[0] == {'name': 'repo0', 'teams': 'devs:push',
+                       'protected': True}
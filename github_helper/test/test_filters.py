@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from pytest import fixture, raises
+
+from github_helper import filters
+
+
+@fixture
+def repos():
+    return pd.DataFrame({
+        'name': ['fluidity', 'fluidity-docs', 'spud', 'old-fork'],
+        'language': ['Fortran', None, 'Python', 'Python'],
+        'topics': [['cfd', 'fem'], [], ['xml'], ['cfd']],
+        'fork': [False, False, False, True],
+        'archived': [False, False, True, False],
+        'size': [50000, 100, 2000, 10],
+        'pushed_at': ['2024-06-01T00:00:00Z', '2023-01-01T00:00:00Z',
+                      '2019-05-05T00:00:00Z', None]})
+
+
+def names(repos, expression):
+    return list(repos.name[filters.compile_filter(expression)(repos)])
+
+
+def test_is_expression():
+    assert not filters.is_expression('fluidity-*')
+    assert not filters.is_expression('[ab]*')
+    assert filters.is_expression('name:fluidity-*')
+    assert filters.is_expression('NOT fork')
+    assert not filters.is_expression('wow!')
+
+
+def test_filters(repos):
+    assert names(repos, 'fluidity*') == ['fluidity', 'fluidity-docs']
+    assert names(repos, 'name:fluidity-* AND pushed_at<2024-01-01 AND NOT fork'
+                 ) == ['fluidity-docs']
+    assert names(repos, 'language=Python fork') == ['old-fork']
+    assert names(repos, 'topics:cf? OR size>=2000') == ['fluidity', 'spud',
+                                                        'old-fork']
+    assert names(repos, 'NOT (archived OR fork) language!=Fortran'
+                 ) == ['fluidity-docs']
+    assert names(repos, 'pushed_at>50y') == ['fluidity', 'fluidity-docs',
+                                               'spud']
+    assert names(repos, '') == list(repos.name)
+
+
+def test_filter_errors(repos):
+    for expression in ('size>big', 'colour:red', 'fork=maybe', '(fork', 'name:'):
+        with raises(filters.FilterError):
+            filters.compile_filter(expression)(repos)
+
+
+def test_index_reused(repos):
+    assert filters.index_for(repos) is filters.index_for(repos)
+    index = filters.RepositoryIndex(repos)
+    uniques, codes, rows = index.categories('topics')
+    assert list(uniques) == ['cfd', 'fem', 'xml']
+    assert list(rows[codes == 0]) == [0, 3]
+    assert index.column('fork').dtype == np.bool_
+
+
+def test_schema_checked_at_compile():
+    for expression in ('colour:red', 'size>big', 'fork=maybe',
+                       'name<b', 'pushed_at>soon'):
+        with raises(filters.FilterError):
+            filters.compile_filter(expression, filters.REPOSITORY_FIELDS)
+    filters.compile_filter('name:a* size>1 NOT fork pushed_at<90d',
+                           filters.REPOSITORY_FIELDS)
+
+
+def test_globs(repos):
+    assert names(repos, 'name:fluid*') == ['fluidity', 'fluidity-docs']
+    assert names(repos, 'name:*docs') == ['fluidity-docs']
+    assert names(repos, 'name:*') == list(repos.name)
+    assert names(repos, 'language:P*') == ['spud', 'old-fork']
+
+
+def test_case_insensitive(repos):
+    assert names(repos, 'language:python') == ['spud', 'old-fork']
+    assert names(repos, 'language=FORTRAN') == ['fluidity']
+    assert names(repos, 'language!=python') == ['fluidity', 'fluidity-docs']
+    assert names(repos, 'name:Fluid*') == ['fluidity', 'fluidity-docs']
+    assert names(repos, 'topics:CFD') == ['fluidity', 'old-fork']
+    assert names(repos, 'SPU?') == ['spud']
@@ -2,6 +2,7 @@ from collections import deque
 
 from pytest import fixture
 
+from qtpy import QtGui
 from qtpy.QtWidgets import QApplication
 
 from github_helper import gui
@@ -27,8 +28,197 @@ class FakeAPI():
 
 @fixture
 def win():
-    app = QApplication([])
+    app = QApplication.instance() or QApplication([])
     return gui.MainWindow(app)
 
 def test_main_window(win):
     assert win
+
+def test_matching_repositories():
+    import pandas as pd
+    repos = pd.DataFrame({'name': ['a1', 'a2', 'b1'],
+                          'archived': [False, True, False],
+                          'fork': [False, False, True]})
+    assert list(gui.matching_repositories(repos, 'a*').name) == ['a1']
+    assert list(gui.matching_repositories(repos, 'A*').name) == ['a1']
+    assert list(gui.matching_repositories(repos, 'a* OR fork').name) == ['a1', 'b1']
+    assert list(gui.matching_repositories(repos, 'archived=true').name) == ['a2']
+    assert list(gui.matching_repositories(repos, 'wow!').name) == []
+
+def test_enriched_model():
+    import pandas as pd
+    from qtpy import QtCore
+    from github_helper import table
+
+    app = QApplication.instance() or QApplication([])
+    repos = pd.DataFrame({'name': ['a', 'b', 'c'],
+                          'full_name': ['o/a', 'o/b', 'o/c']})
+    fetched = []
+
+    def upper(repo):
+        fetched.append(repo['name'])
+        return repo['name'].upper()
+
+    model = table.EnrichedModel(repos[['name']], repos, {'upper': upper})
+    assert model.columnCount() == 2
+    assert model.data(model.index(0, 1)) == model.PENDING
+
+    model.request_rows(0, 1)
+    pool = QtCore.QThreadPool.globalInstance()
+    pool.waitForDone()
+    app.processEvents()
+
+    assert sorted(fetched) == ['a', 'b']
+    assert model.data(model.index(1, 1)) == 'B'
+    assert model.data(model.index(2, 1)) == model.PENDING
+
+def test_prefetcher():
+    api = FakeAPI()
+    api.append([{'public_repos': 3}, None,
+                [{'name': 'a'}, {'name': 'b'}], [{'name': 'c'}]])
+    prefetcher = gui.Prefetcher(api, '/orgs/test')
+    prefetcher.run()
+    assert [repo['name'] for repo in prefetcher.data] == ['a', 'b', 'c']
+    assert prefetcher.complete
+    assert list(prefetcher.frame.name) == ['a', 'b', 'c']
+
+def test_prefetcher_snapshot(tmpdir):
+    from http.client import IncompleteRead
+    from urllib.error import URLError
+    from github_helper import snapshot
+
+    path = snapshot.snapshot_path(str(tmpdir), '/orgs/test')
+    api = FakeAPI()
+    api.append([{'public_repos': 2}, None,
+                [{'id': 1, 'name': 'a', 'archived': False},
+                 {'id': 2, 'name': 'b', 'archived': True}]])
+    gui.Prefetcher(api, '/orgs/test', snapshot=path).run()
+    frame, _ = snapshot.load_snapshot(path)
+    assert list(frame.name) == ['a', 'b']
+
+    for failure in (URLError('offline'), ConnectionResetError(),
+                    IncompleteRead(b'')):
+        def unreachable(url, *args, **kwargs):
+            raise failure
+
+        prefetcher = gui.Prefetcher(unreachable, '/orgs/tset')
+        prefetcher.run()
+        assert not prefetcher.complete and prefetcher.frame is None
+        assert prefetcher.error is failure
+
+    # An unwritable snapshot still leaves the listing usable.
+    api.append([{'public_repos': 1}, None, [{'id': 1, 'name': 'a'}]])
+    prefetcher = gui.Prefetcher(api, '/orgs/test',
+                                snapshot=tmpdir.join('missing', 'x.ghsnap'))
+    prefetcher.run()
+    assert list(prefetcher.frame.name) == ['a']
+    assert isinstance(prefetcher.error, OSError)
+
+    api.append([{'public_repos': 3}, None, []])
+    prefetcher = gui.Prefetcher(api, '/orgs/test')
+    prefetcher.run()
+    assert prefetcher.data == []
+
+def test_invalid_pattern_warns(win, monkeypatch):
+    from qtpy import QtWidgets
+    warnings = []
+    monkeypatch.setattr(QtWidgets.QMessageBox, 'warning',
+                        lambda *args: warnings.append(args[-1]))
+    win.progress = None
+    win.repos = [{'name': 'a', 'archived': False, 'size': 10}]
+    win._repo_pattern.setText('size>big')
+    assert not win._valid_pattern()
+    win._repo_pattern.setText('colour:red')
+    assert not win._valid_pattern()
+    assert win._matching() is None
+    win._repo_pattern.setText('size>5')
+    assert list(win._matching().name) == ['a']
+    assert len(warnings) == 3
+
+def test_webhook_updates_inventory(win):
+    import pandas as pd
+    from github_helper.test.test_webhook import deliver
+
+    win.config['Webhook Secret'] = 'swordfish'
+    win.config['Webhook Port'] = '0'
+    win._start_webhook()
+    try:
+        frame = pd.DataFrame({'id': [1], 'name': ['a'], 'archived': [False]})
+        win._inventory['/orgs/org'] = (frame, None)
+        assert deliver(win._webhook, 'repository',
+                       {'action': 'archived',
+                        'repository': {'id': 1, 'name': 'a', 'archived': True,
+                                       'owner': {'login': 'Org'}}}) == 204
+        QApplication.processEvents()
+        frame, _ = win._inventory['/orgs/org']
+        assert list(frame.archived) == [True]
+
+        # Team access is listed once, then kept current by deliveries.
+        api = FakeAPI()
+        api.append([[{'id': 1, 'permissions': {'pull': True}}]])
+        win.api, win.team_id = api, 7
+        win._enrichment_cache[('teams', 'org/a')] = 'devs:pull'
+        win._enrichment_cache[('protected', 'org/a')] = True
+        assert list(win._team_repositories().id) == [1]
+        assert deliver(win._webhook, 'team',
+                       {'action': 'removed_from_repository',
+                        'team': {'id': 7},
+                        'repository': {'id': 1, 'full_name': 'org/a'}}) == 204
+        QApplication.processEvents()
+        assert list(win._team_repositories().id) == []
+        assert list(win._enrichment_cache) == [('protected', 'org/a')]
+    finally:
+        win.closeEvent(QtGui.QCloseEvent())
+    assert win._webhook is None
+
+def test_settings_include_new_defaults(tmpdir, monkeypatch):
+    import json
+    import pathlib
+
+    path = tmpdir.join('.config', 'github_helper', 'config.json')
+    path.write(json.dumps({'token': 'abc', 'Default Type': 'User',
+                           'Default GitHub Identity': 'someone',
+                           'Default Repository Pattern': '*'}), ensure=True)
+    monkeypatch.setattr(pathlib.Path, 'home', lambda: pathlib.Path(tmpdir))
+    win = gui.MainWindow(QApplication.instance() or QApplication([]))
+    win._config()
+    labels = [win.configgrid.itemAtPosition(row, 0).widget().text()
+              for row in range(win.configgrid.rowCount())]
+    assert 'Archive Batch Size' in labels
+    assert 'Webhook Port' in labels
+    assert win.config['token'] == 'abc'
+    win.closeEvent(QtGui.QCloseEvent())
+
+def test_prefetch_after_interrupt(win, tmpdir):
+    import threading
+
+    release = threading.Event()
+
+    class SlowAPI():
+        def set_token(self, token):
+            pass
+
+        def without_error_handler(self):
+            return self
+
+        def __call__(self, url, *args, **kwargs):
+            release.wait(5)
+            raise ConnectionResetError()
+
+    win.api = SlowAPI()
+    win._snapshot_dir = str(tmpdir)
+    win._prefetch_timer.stop()
+    win._identity.setText('org')
+    try:
+        win._prefetch()
+        win._prefetch()
+        assert len(win._prefetch_threads) == 1
+        # A listing interrupted by an edit or a write no longer blocks
+        # a fresh one for the same identity.
+        win._stop_prefetch()
+        win._prefetch()
+        assert len(win._prefetch_threads) == 2
+    finally:
+        release.set()
+        for thread, _ in win._prefetch_threads:
+            thread.wait()
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from github_helper import filters, snapshot
+
+
+def repos(n=3):
+    return [{'id': i, 'name': f'repo{i}', 'full_name': f'org/repo{i}',
+             'node_id': f'id{i}', 'fork': i == 1, 'archived': False,
+             'language': None if i == 2 else 'Python', 'size': 10*i,
+             'pushed_at': None if i == 2 else f'202{i}-01-01T00:00:00Z',
+             'topics': [] if i else ['cfd', 'fem'], 'owner': {'login': 'org'}}
+            for i in range(n)]
+
+
+def test_round_trip(tmpdir):
+    path = snapshot.snapshot_path(str(tmpdir), '/orgs/org')
+    assert path.name == 'orgs_org.ghsnap'
+    assert snapshot.load_snapshot(path) is None
+
+    snapshot.save_snapshot(path, repos())
+    frame, saved = snapshot.load_snapshot(path)
+
+    assert saved > 0
+    assert 'owner' not in frame.columns
+    assert list(frame.name) == ['repo0', 'repo1', 'repo2']
+    assert list(frame.id) == [0, 1, 2]
+    assert list(frame.fork) == [False, True, False]
+    assert pd.isna(frame.language[2])
+    assert frame.topics[0] == ['cfd', 'fem']
+    assert frame.topics[1] == []
+    assert pd.isna(frame.pushed_at[2])
+    assert frame.pushed_at[1] == np.datetime64('2021-01-01')
+
+    select = filters.compile_filter('pushed_at<2021-06-01 topics:cfd')
+    assert list(frame.name[select(frame)]) == ['repo0']
+
+
+def test_version_mismatch(tmpdir, monkeypatch):
+    path = str(tmpdir.join('old.ghsnap'))
+    snapshot.save_snapshot(path, repos())
+    monkeypatch.setattr(snapshot, 'VERSION', snapshot.VERSION + 1)
+    assert snapshot.load_snapshot(path) is None
+
+
+def test_corrupt(tmpdir):
+    path = str(tmpdir.join('org.ghsnap'))
+    snapshot.save_snapshot(path, repos())
+    with open(path, 'rb') as infile:
+        data = infile.read()
+    assert tmpdir.listdir() == [tmpdir.join('org.ghsnap')]
+
+    # Truncated anywhere, including inside the header and column table.
+    for size in (0, 10, 40, len(data) // 2, len(data) - 1):
+        with open(path, 'wb') as outfile:
+            outfile.write(data[:size])
+        assert snapshot.load_snapshot(path) is None
+
+    with open(path, 'wb') as outfile:
+        outfile.write(data[:-20] + b'\xff' * 20)
+    assert snapshot.load_snapshot(path) is None
+
+
+def test_filter_fields_kept(tmpdir):
+    path = str(tmpdir.join('org.ghsnap'))
+    live = pd.DataFrame([
+        dict(repo, is_template=not repo['id'], has_issues=repo['id'] != 1,
+             homepage='https://example.org', watchers_count=repo['id'])
+        for repo in repos()])
+    snapshot.save_snapshot(path, live)
+    frame, _ = snapshot.load_snapshot(path)
+
+    fields = set(filters.REPOSITORY_FIELDS) & set(live.columns)
+    assert fields <= set(frame.columns)
+    for text in ('is_template=true', 'NOT has_issues', 'watchers_count>0',
+                 'homepage:*example*'):
+        select = filters.compile_filter(text, filters.REPOSITORY_FIELDS)
+        assert list(frame.name[select(frame)]) == list(live.name[select(live)])
@@ -0,0 +1,115 @@
+import hashlib
+import hmac
+import json
+from urllib import request, error
+
+from pytest import fixture, raises
+
+from github_helper import webhook
+
+SECRET = 'swordfish'
+
+
+@fixture
+def receiver():
+    inventory = webhook.Inventory([{'id': 1, 'name': 'old'}])
+    receiver = webhook.WebhookReceiver(inventory, SECRET)
+    receiver.start()
+    yield receiver
+    receiver.stop()
+
+
+def deliver(receiver, event, payload, secret=SECRET):
+    body = json.dumps(payload).encode('utf-8')
+    digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256)
+    host, port = receiver.address
+    req = request.Request(f'http://{host}:{port}/', data=body,
+                          headers={'X-GitHub-Event': event,
+                                   'X-Hub-Signature-256':
+                                   'sha256='+digest.hexdigest()})
+    return request.urlopen(req).status
+
+
+def test_repository_events(receiver):
+    assert deliver(receiver, 'repository',
+                   {'action': 'created',
+                    'repository': {'id': 2, 'name': 'new'}}) == 204
+    assert deliver(receiver, 'repository',
+                   {'action': 'deleted',
+                    'repository': {'id': 1, 'name': 'old'}}) == 204
+    assert deliver(receiver, 'push', {}) == 202
+    repos = receiver.inventory.repositories()
+    assert [repo['name'] for repo in repos] == ['new']
+
+
+def test_team_events(receiver):
+    team = {'id': 7, 'name': 'devs'}
+    deliver(receiver, 'team_add',
+            {'team': team, 'repository': {'id': 1, 'name': 'old'}})
+    deliver(receiver, 'team',
+            {'action': 'added_to_repository', 'team': team,
+             'repository': {'id': 2, 'permissions': {'push': True}}})
+    assert receiver.inventory.team_repositories(7) == {1: 'pull', 2: 'push'}
+
+    deliver(receiver, 'team',
+            {'action': 'removed_from_repository', 'team': team,
+             'repository': {'id': 1}})
+    assert receiver.inventory.team_repositories(7) == {2: 'push'}
+
+
+def test_bad_signature(receiver):
+    with raises(error.HTTPError) as err:
+        deliver(receiver, 'repository',
+                {'action': 'created', 'repository': {'id': 3}}, 'wrong')
+    assert err.value.code == 401
+    assert len(receiver.inventory.repositories()) == 1
+
+
+def test_team_permission_edited(receiver):
+    team = {'id': 7, 'name': 'devs'}
+    deliver(receiver, 'team_add', {'team': team, 'repository': {'id': 1}})
+    assert deliver(receiver, 'team',
+                   {'action': 'edited', 'team': team,
+                    'changes': {'repository': {'permissions': {
+                        'from': {'pull': True, 'push': False}}}},
+                    'repository': {'id': 1, 'permissions': {
+                        'pull': True, 'push': True}}}) == 204
+    assert receiver.inventory.team_repositories(7) == {1: 'push'}
+
+
+def test_incomplete_payload(receiver):
+    with raises(error.HTTPError) as err:
+        deliver(receiver, 'team_add', {'team': {'id': 7}})
+    assert err.value.code == 400
+    with raises(error.HTTPError) as err:
+        deliver(receiver, 'repository', {'action': 'created'})
+    assert err.value.code == 400
+
+
+def test_update_frame():
+    import pandas as pd
+
+    frame = pd.DataFrame({'id': [1, 2], 'name': ['a', 'b']})
+    frame = webhook.update_frame(frame, 'renamed',
+                                 {'id': 2, 'name': 'c', 'owner': {}})
+    assert list(frame.columns) == ['id', 'name']
+    assert sorted(frame.name) == ['a', 'c']
+    frame = webhook.update_frame(frame, 'deleted', {'id': 1})
+    assert list(frame.name) == ['c']
+
+
+def test_loaded_team(receiver):
+    inventory = receiver.inventory
+    team = {'id': 7, 'name': 'devs'}
+    deliver(receiver, 'team', {'action': 'added_to_repository', 'team': team,
+                               'repository': {'id': 2}})
+    assert not inventory.has_team(7)
+
+    inventory.load_team(7, [{'id': 1, 'permissions': {'admin': True}}])
+    assert inventory.has_team(7)
+    deliver(receiver, 'team', {'action': 'added_to_repository', 'team': team,
+                               'repository': {'id': 3}})
+    assert inventory.team_repositories(7) == {1: 'admin', 3: 'pull'}
+
+    deliver(receiver, 'team', {'action': 'deleted', 'team': team})
+    assert not inventory.has_team(7)
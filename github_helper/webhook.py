@@ -0,0 +1,207 @@
+"""Module receiving GitHub webhook deliveries on a local HTTP server,
+and applying repository, team and team_add events to a cached
+inventory, so that it stays current without polling the API.
+"""
+
+import collections
+import hashlib
+import hmac
+import json
+import socketserver
+import threading
+from http import server
+
+import pandas as pd
+
+__all__ = ['Inventory', 'WebhookReceiver', 'update_frame',
+           'verify_signature']
+
+
+def verify_signature(secret, body, signature):
+    """Check an X-Hub-Signature-256 header against a delivery body."""
+    if not signature or not signature.startswith('sha256='):
+        return False
+    digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256)
+    return hmac.compare_digest('sha256='+digest.hexdigest(), signature)
+
+
+def _permission(repo):
+    """Return the highest permission in a repository permissions dict."""
+    permissions = repo.get('permissions') or {}
+    for level in ('admin', 'maintain', 'push', 'triage', 'pull'):
+        if permissions.get(level):
+            return level
+    return 'pull'
+
+
+def update_frame(frame, action, repo):
+    """Return a DataFrame of repositories with a repository event's
+    action applied to it, keeping only the columns already present."""
+    rest = frame.loc[frame['id'] != repo['id']]
+    if action in ('deleted', 'transferred'):
+        return rest
+    row = pd.DataFrame([repo]).reindex(columns=frame.columns)
+    return pd.concat([rest, row], ignore_index=True)
+
+
+class Inventory():
+    """Thread safe cache of repositories and team access, keyed by id."""
+
+    def __init__(self, repos=()):
+        self._lock = threading.RLock()
+        self._repos = {}
+        self._teams = {}
+        self._team_repos = collections.defaultdict(dict)
+        # Teams whose whole repository list has been loaded, rather
+        # than pieced together from deliveries.
+        self._loaded_teams = set()
+        self.version = 0
+        self.load_repositories(repos)
+
+    def load_repositories(self, repos):
+        with self._lock:
+            for repo in repos:
+                self._repos[repo['id']] = repo
+            self.version += 1
+
+    def repositories(self):
+        """Return a list of the cached repositories."""
+        with self._lock:
+            return list(self._repos.values())
+
+    def teams(self):
+        with self._lock:
+            return list(self._teams.values())
+
+    def load_team(self, team_id, repos):
+        """Replace a team's access with a listing of its repositories,
+        e.g. from /teams/{id}/repos."""
+        with self._lock:
+            self._team_repos[team_id] = {repo['id']: _permission(repo)
+                                         for repo in repos}
+            self._loaded_teams.add(team_id)
+            self.version += 1
+
+    def forget_team(self, team_id):
+        with self._lock:
+            self._team_repos.pop(team_id, None)
+            self._loaded_teams.discard(team_id)
+            self.version += 1
+
+    def has_team(self, team_id):
+        """Return whether a team's whole repository list is known."""
+        with self._lock:
+            return team_id in self._loaded_teams
+
+    def team_repositories(self, team_id):
+        """Return a dict of repository id to permission for a team."""
+        with self._lock:
+            return dict(self._team_repos.get(team_id, {}))
+
+    def apply(self, event, payload):
+        """Apply a webhook delivery, returning whether it was used."""
+        handler = getattr(self, f'_on_{event}', None)
+        if not handler:
+            return False
+        with self._lock:
+            handler(payload.get('action'), payload)
+            self.version += 1
+        return True
+
+    def _on_repository(self, action, payload):
+        repo = payload['repository']
+        if action in ('deleted', 'transferred'):
+            self._repos.pop(repo['id'], None)
+            for repos in self._team_repos.values():
+                repos.pop(repo['id'], None)
+        else:
+            self._repos[repo['id']] = repo
+
+    def _on_team(self, action, payload):
+        team = payload['team']
+        changes = payload.get('changes') or {}
+        if action == 'deleted':
+            self._teams.pop(team['id'], None)
+            self._team_repos.pop(team['id'], None)
+            self._loaded_teams.discard(team['id'])
+            return
+        self._teams[team['id']] = team
+        repo = payload.get('repository')
+        if action == 'added_to_repository' and repo:
+            self._team_repos[team['id']][repo['id']] = _permission(repo)
+        elif action == 'removed_from_repository' and repo:
+            self._team_repos[team['id']].pop(repo['id'], None)
+        elif action == 'edited' and repo and 'repository' in changes:
+            # The repository carries the permissions after the edit.
+            self._team_repos[team['id']][repo['id']] = _permission(repo)
+
+    def _on_team_add(self, action, payload):
+        team, repo = payload['team'], payload['repository']
+        self._teams[team['id']] = team
+        self._team_repos[team['id']][repo['id']] = _permission(repo)
+
+
+class _Handler(server.BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        receiver = self.server.receiver
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        if not verify_signature(receiver.secret, body,
+                                self.headers.get('X-Hub-Signature-256')):
+            self.send_error(401, 'Bad signature')
+            return
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.send_error(400, 'Invalid JSON')
+            return
+
+        event = self.headers.get('X-GitHub-Event', '')
+        try:
+            applied = receiver.inventory.apply(event, payload)
+        except (KeyError, TypeError, AttributeError):
+            self.send_error(400, 'Incomplete payload')
+            return
+        if applied and receiver.callback:
+            receiver.callback(event, payload)
+        self.send_response(204 if applied else 202)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, server.HTTPServer):
+    daemon_threads = True
+
+
+class WebhookReceiver():
+    """Local HTTP listener applying signed webhook deliveries to an
+    Inventory. Port 0 picks a free port, available from .address."""
+
+    def __init__(self, inventory, secret, host='127.0.0.1', port=0,
+                 callback=None):
+        if not secret:
+            raise ValueError('A webhook secret is required')
+        self.inventory = inventory
+        self.secret = secret
+        self.callback = callback
+        self._server = _Server((host, port), _Handler)
+        self._server.receiver = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()